@@ -0,0 +1,233 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""
+PSG - Tecnologia Aplicada
+
+Este é um módulo utilizado para contagem de falhas em
+plantações de cana-de-açúcar através do uso de imagens
+aéreas capturadas por VANT's ou aparelhos similares.
+
+Este arquivo reúne medições de desempenho das etapas do
+algoritmo, executadas a partir da linha de comando sobre
+uma imagem de teste.
+"""
+import argparse
+import time
+import sys
+import os
+
+sys.path.append(os.path.dirname(__file__))
+
+def shred(args):
+    """
+    Carrega a imagem de teste e a recorta em retalhos.
+    :param args Argumentos da linha de comando.
+    :return list Retalhos da imagem.
+    """
+    from core.patchwork import PatchWork
+    from core.image import Image
+
+    pwork = PatchWork((args.size, args.size), Image.load(args.image))
+    return pwork.shred()
+
+def backend(args):
+    """
+    Compara os classificadores disponíveis para a segmentação.
+    Para cada classificador são medidas a vazão de pixels e a
+    concordância com as máscaras produzidas pelo KNN.
+    :param args Argumentos da linha de comando.
+    """
+    from core.segmentator import Segmentator
+    from core import classifier
+    import config
+
+    patches = shred(args)
+
+    ref = Segmentator.train(table = 0, backend = "knn")
+    masks = [image.raw for image in ref.apply_many(patches)]
+    total = float(sum(mask.size for mask in masks))
+
+    print "{0:<12} {1:>6} {2:>10} {3:>10}".format("backend", "table", "Mpx/s", "agree")
+
+    for name in sorted(classifier.backends.keys()):
+        for table in [0, config.segtable]:
+            seg = Segmentator.train(table = table, backend = name)
+            seg.unique = False
+
+            start = time.time()
+            result = seg.apply_many(patches)
+            elapsed = time.time() - start
+
+            agree = sum((a.raw == b).sum() for a, b in zip(result, masks))
+            print "{0:<12} {1:>6} {2:>10.2f} {3:>10.4f}".format(
+                name, table, total / elapsed / 1e6, agree / total
+            )
+
+def coarse(args):
+    """
+    Compara a segmentação do grosso para o fino com a segmentação
+    na resolução original. Para cada fator de redução são medidos
+    o ganho de tempo, a concordância entre as máscaras e a diferença
+    na quantidade de componentes encontrados.
+    :param args Argumentos da linha de comando.
+    """
+    from core.segmentator import Segmentator
+    from core.component import ComponentList
+
+    patches = shred(args)
+
+    seg = Segmentator.train(table = args.table)
+    seg.coarse = 1
+    seg.apply(patches[0])
+
+    start = time.time()
+    masks = [seg.apply(patch) for patch in patches]
+    base = time.time() - start
+
+    total = float(sum(mask.raw.size for mask in masks))
+    comps = sum(ComponentList.load(mask)[0].count for mask in masks)
+
+    print "{0:>6} {1:>10} {2:>10} {3:>10} {4:>10}".format(
+        "factor", "seconds", "speedup", "agree", "comps"
+    )
+
+    print "{0:>6} {1:>10.3f} {2:>10.2f} {3:>10.4f} {4:>10}".format(1, base, 1., 1., comps)
+
+    for factor in [2, 4, 8]:
+        start = time.time()
+        result = [seg.refine(patch, factor) for patch in patches]
+        elapsed = time.time() - start
+
+        agree = sum((a.raw == b.raw).sum() for a, b in zip(result, masks))
+        count = sum(ComponentList.load(mask)[0].count for mask in result)
+
+        print "{0:>6} {1:>10.3f} {2:>10.2f} {3:>10.4f} {4:>10}".format(
+            factor, elapsed, base / elapsed, agree / total, count
+        )
+
+def lines(args):
+    """
+    Compara os métodos de detecção das linhas de plantação sobre os
+    mesmos retalhos. Para cada método são medidos o tempo de detecção,
+    a quantidade de linhas encontradas e a porcentagem média de falhas.
+    :param args Argumentos da linha de comando.
+    """
+    from core.segmentator import Segmentator
+    from core.component import ComponentList
+    from core import FindLines
+
+    seg = Segmentator.shared()
+    masks = seg.apply_many(shred(args))
+
+    print "{0:<8} {1:>10} {2:>8} {3:>10}".format("engine", "seconds", "lines", "failure")
+
+    for engine in ["greedy", "profile"]:
+        elapsed, count, failure = 0., 0, 0.
+
+        for mask in masks:
+            lcomp, cmap, inverted = ComponentList.load(mask)
+
+            start = time.time()
+            found = FindLines(cmap, engine)
+            elapsed = elapsed + time.time() - start
+
+            count = count + found.count
+            failure = failure + found.error(args.distance, inverted)[0]
+
+        print "{0:<8} {1:>10.3f} {2:>8} {3:>10.2f}".format(
+            engine, elapsed, count, failure / len(masks)
+        )
+
+def scheduler(args):
+    """
+    Mede o custo do escalonamento das tarefas do pipeline: o uso de
+    processador enquanto os estágios estão ociosos e a latência entre
+    a chegada de uma tarefa à fila e o início de sua execução.
+    :param args Argumentos da linha de comando.
+    """
+    from controller.pipeline import Pipeline, segment, process, normal, stagename
+    from controller.pipeline.multistage import MultiStage
+    from controller.pipeline.metrics import Metrics
+
+    patches = shred(args)
+    Pipeline.init()
+
+    before = sum(os.times()[:2])
+    time.sleep(args.idle)
+    cpu = (sum(os.times()[:2]) - before) / args.idle
+
+    comm = MultiStage(normal, segment, process)
+    comm.event = False
+
+    start = time.time()
+
+    for i, patch in enumerate(patches):
+        comm.push(patch = patch, distance = 1.5, id = i)
+
+    comm.consume()
+    elapsed = time.time() - start
+
+    print "idle cpu {0:.1f}% of a core, {1} patches in {2:.3f}s".format(
+        100 * cpu, len(patches), elapsed
+    )
+
+    print "{0:<16} {1:>12} {2:>12}".format("stage", "latency ms", "idle ms")
+
+    for stage in [segment, process]:
+        print "{0:<16} {1:>12.3f} {2:>12.3f}".format(
+            stagename[stage],
+            1000 * Metrics.mean(stage, "latency"),
+            1000 * Metrics.mean(stage, "idle")
+        )
+
+    Pipeline.stop()
+
+if __name__ == '__main__':
+    import config
+
+    parser = argparse.ArgumentParser(
+        prog = "benchmark",
+        description = u"Mede o desempenho das etapas do algoritmo."
+    )
+
+    parser.add_argument(
+        "image", nargs = "?",
+        default = os.path.join(config.root, "img", "image.png"),
+        help = u"imagem utilizada nas medições"
+    )
+
+    parser.add_argument(
+        "-s", "--size",
+        type = int, default = 200,
+        help = u"tamanho dos retalhos"
+    )
+
+    sub = parser.add_subparsers(dest = "bench")
+    sub.add_parser("backend", help = u"compara os classificadores de segmentação")
+
+    sub.add_parser(
+        "coarse", help = u"compara a segmentação do grosso para o fino"
+    ).add_argument(
+        "-t", "--table",
+        type = int, default = 0,
+        help = u"bits da tabela de consulta, 0 a desativa"
+    )
+
+    sub.add_parser(
+        "lines", help = u"compara os métodos de detecção das linhas"
+    ).add_argument(
+        "-d", "--distance",
+        type = float, default = 1.5,
+        help = u"distância entre as linhas de plantação, em metros"
+    )
+
+    sub.add_parser(
+        "scheduler", help = u"mede o custo do escalonamento do pipeline"
+    ).add_argument(
+        "-i", "--idle",
+        type = float, default = 2.0,
+        help = u"tempo, em segundos, de medição do pipeline ocioso"
+    )
+
+    args = parser.parse_args()
+    globals()[args.bench](args)
@@ -12,12 +12,86 @@ programa e também pela execução e apresentação dos
 resultados obtidos com a imagem fornecida.
 """
 from os import path
+from multiprocessing import cpu_count
 
 #TODO: Criar objeto de configuração, que lê de arquivos as opções selecionadas.
 
 root = path.dirname(path.realpath(__file__))
+cache = path.join(root, "cache")
 author = "Rodrigo Siqueira <rodriados@gmail.com>"
 appname = "PSG - Tecnologia Aplicada / LIA - FACOM - UFMS"
 version = "0.6"
 wsize = (800, 600)
 wid = 0
+
+# Segmentação. A tabela de consulta avalia o classificador uma única vez
+# sobre todo o cubo L*a*b*, quantizado com a quantidade de bits por canal
+# indicada. O valor 0 desativa a tabela e cada pixel é classificado.
+segtable = 6
+
+# Classificador utilizado na segmentação: "knn", "centroid", "mahalanobis",
+# "gaussian" ou "linear".
+segbackend = "knn"
+
+# Classifica apenas as cores distintas de cada retalho quando a tabela
+# de consulta estiver desativada.
+segunique = True
+
+# Fator de redução da segmentação do grosso para o fino. A imagem reduzida
+# é classificada e apenas as bordas entre classes são refinadas. O valor 1
+# segmenta todos os pixels na resolução original, e deve ser mantido até
+# que "benchmark.py coarse" mostre ganho de tempo nas imagens de campo.
+segcoarse = 1
+
+# Quantidade máxima de retalhos segmentados de uma única vez.
+segbatch = 8
+
+# Inclinação mínima, em graus, para que as linhas de plantação sejam
+# alinhadas à vertical antes do rastreamento. Linhas menos inclinadas
+# são rastreadas sem rotação.
+deskew = 2
+
+# Método de detecção das linhas de plantação: "greedy" cresce as linhas
+# uma a uma a partir do maior componente; "profile" propõe todas as
+# linhas de uma vez pelo perfil de projeção da máscara.
+lineengine = "greedy"
+
+# Execução dos estágios do pipeline: "thread" executa cada estágio em um
+# thread do processo principal; "process" executa cada estágio em um
+# processo de trabalho, com as imagens trafegando por memória compartilhada.
+pipeline = "thread"
+
+# Tamanho, em bytes, de cada região de memória compartilhada de um processo
+# de trabalho, e tamanho mínimo de uma matriz para que trafegue por ela. As
+# regiões comportam um lote de retalhos de 200 pixels; matrizes que não
+# couberem são enviadas pelo canal de comunicação.
+shmsize = 4 << 20
+shmleast = 4096
+
+# Memória máxima, em bytes, ocupada pelas regiões compartilhadas de todos os
+# processos de trabalho. É independente do orçamento das tarefas, e processos
+# criados além do limite recebem regiões menores.
+shmbudget = 128 << 20
+
+# Tempo de espera, em segundos, para que uma tarefa do pipeline suba um
+# nível de prioridade. Impede que tarefas de baixa prioridade esperem
+# indefinidamente.
+aging = 2.0
+
+# Quantidade de trabalhadores de cada estágio do pipeline: carga,
+# segmentação e processamento. Pode ser alterada em tempo de execução
+# por Pipeline.resize.
+workers = [1, cpu_count(), cpu_count()]
+
+# Quantidade máxima de tarefas à espera em cada estágio do pipeline, e
+# memória máxima, em bytes, ocupada pelas imagens das tarefas em trânsito.
+# Produtores esperam enquanto os limites estiverem excedidos. O valor 0
+# desativa o limite.
+queuesize = 32
+budget = 512 << 20
+
+# Tamanho máximo, em bytes, do armazenamento em disco dos resultados do
+# processamento de retalhos. Retalhos inalterados, com o mesmo conjunto de
+# treinamento e os mesmos parâmetros, não são processados novamente. O
+# valor 0 desativa o armazenamento.
+resultcache = 256 << 20
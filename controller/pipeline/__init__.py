@@ -11,9 +11,14 @@ Este arquivo é responsável pelo desenho da interface do
 programa e também pela execução e apresentação dos
 resultados obtidos com a imagem fornecida.
 """
-from Queue import Queue, Empty
+from threading import Event, Lock
 from .. import ThreadWrapper
+from .scheduler import Scheduler, Budget
+from .metrics import Metrics
+import config
+import numpy
 import core
+import time
 
 __all__ = [
     "Pipeline", "stagename",
@@ -21,8 +26,6 @@ __all__ = [
     "load", "segment", "process",
 ]
 
-#TODO: Transformar os estágios do pipeline em processos e não threads.
-#TODO: Implementar protocolo de pacotes para comunicação entre processos.
 
 low, normal, high = range(3)
 load, segment, process = range(3)
@@ -36,7 +39,13 @@ class Pipeline(object):
     o pipeline.
     """
     _alive = True
-    _queue = [[Queue() for i in xrange(3)] for j in xrange(3)]
+    _queue = [Scheduler(stage) for stage in xrange(3)]
+    _budget = Budget()
+    _stages = {}
+    _flags = [[] for stage in xrange(3)]
+    _spare = [[] for stage in xrange(3)]
+    _shared = 0
+    _lock = Lock()
 
     @classmethod
     def init(cls):
@@ -44,9 +53,22 @@ class Pipeline(object):
         Inicializa a execução do pipeline de tarefas para
         o processamento paralelo das imagens.
         """
-        cls.start(load, core.LoadImage)
-        cls.start(segment, core.SegmentImage)
-        cls.start(process, core.ProcessImage)
+        cls._stages = {
+            load: (core.LoadImage, None),
+            segment: (core.SegmentImages, config.segbatch),
+            process: (core.ProcessImage, None),
+        }
+
+        # Os processos de trabalho são criados antes de qualquer thread
+        # do pipeline, para que nenhuma trava seja herdada em uso.
+        if config.pipeline == "process":
+            cls._spare = [
+                [cls.worker() for i in xrange(config.workers[stage])]
+                    for stage in xrange(3)
+            ]
+
+        for stage in xrange(3):
+            cls.resize(stage, config.workers[stage])
 
     @classmethod
     def stop(cls):
@@ -56,24 +78,128 @@ class Pipeline(object):
         """
         cls._alive = False
 
+        for queue in cls._queue:
+            queue.close()
+
+        cls._budget.close()
+
+    @classmethod
+    def size(cls, stage):
+        """
+        Quantidade de trabalhadores ativos em um estágio.
+        :param stage Identificador do estágio.
+        :return int
+        """
+        with cls._lock:
+            return len(cls._flags[stage])
+
+    @classmethod
+    def resize(cls, stage, count):
+        """
+        Altera, em tempo de execução, a quantidade de trabalhadores de
+        um estágio. Trabalhadores excedentes terminam a tarefa que estão
+        executando antes de sair.
+        :param stage Identificador do estágio.
+        :param count Nova quantidade de trabalhadores.
+        """
+        count = max(1, count)
+
+        with cls._lock:
+            flags = cls._flags[stage]
+
+            while len(flags) > count:
+                flags.pop().set()
+
+            while len(flags) < count:
+                flags.append(Event())
+                cls.start(stage, flags[-1])
+
+        cls._queue[stage].wake()
+
     @classmethod
     @ThreadWrapper
-    def start(cls, stage, function):
+    def start(cls, stage, flag):
         """
-        Inicializa um estágio do pipeline.
+        Inicializa um trabalhador de um estágio do pipeline. Caso o
+        estágio trabalhe em lotes, a função recebe uma lista com até
+        batch  tarefas e deve retornar uma lista de respostas na mesma
+        ordem; a resposta None indica que apenas aquela tarefa falhou.
+        As respostas são entregues pelo método notify da comunicação
+        de cada tarefa, qualquer que seja o trabalhador.
         :param stage Identificador do estágio.
-        :param function Função a ser executada pelo estágio.
+        :param flag Sinal de término do trabalhador.
         """
-        while cls._alive:
-            for priority in [high, normal, low]:
-                try:
-                    comm, data = cls._queue[stage][priority].get(False)
-                    comm.notify(stage, data, function(data))
-                except Empty:
+        function, batch = cls._stages[stage]
+        worker = None
+
+        if config.pipeline == "process":
+            with cls._lock:
+                spare = cls._spare[stage]
+                worker = spare.pop() if spare else None
+
+            worker = worker or cls.worker()
+
+        while cls._alive and not flag.is_set():
+            tasks = cls.take(stage, batch or 1)
+
+            if not tasks:
+                continue
+
+            try:
+                start = time.time()
+                datas = [data for comm, data in tasks]
+                responses = worker.run(function, datas, batch) if worker \
+                    else function(datas) if batch else [function(datas[0])]
+                elapsed = (time.time() - start) / len(tasks)
+            except:
+                responses, elapsed = [None] * len(tasks), 0
+
+            for (comm, data), response in zip(tasks, responses):
+                if response is None:
+                    comm.notify(-1, data, {})
                     continue
+
+                try:
+                    Metrics.record(stage, time = elapsed, **response.get("metrics", {}))
+                    comm.notify(stage, data, response)
                 except:
                     comm.notify(-1, data, {})
 
+        if worker:
+            worker.close()
+
+            with cls._lock:
+                cls._shared = cls._shared - 2 * worker.size
+
+    @classmethod
+    def worker(cls):
+        """
+        Cria um processo de trabalho. As regiões de memória compartilhada
+        de todos os processos não excedem config.shmbudget; processos
+        criados além do limite recebem regiões menores, ou nenhuma, e
+        suas matrizes trafegam pelo canal de comunicação.
+        :return Worker
+        """
+        from .pool import Worker
+
+        with cls._lock:
+            size = min(config.shmsize, max(0, config.shmbudget - cls._shared) // 2)
+            cls._shared = cls._shared + 2 * size
+
+        return Worker(size)
+
+    @classmethod
+    def take(cls, stage, count = 1):
+        """
+        Retira até  count  tarefas da fila de um estágio, respeitando
+        a ordem de prioridade. Enquanto não houver tarefas, o thread
+        chamador dorme; uma lista vazia indica que o pipeline parou.
+        :param stage Identificador do estágio.
+        :param count Quantidade máxima de tarefas.
+        :return list
+        """
+        return cls._queue[stage].take(count)
+
     @classmethod
     def push(cls, stage, priority, comm, data):
         """
@@ -84,4 +210,54 @@ class Pipeline(object):
         :param comm Instância de comunicação com Pipeline.
         :param data Lista de argumentos a serem passados ao pipeline.
         """
-        cls._queue[stage][priority].put( (comm, data) )
+        cls._queue[stage].put(priority, (comm, data), priority < high)
+
+    @classmethod
+    def admit(cls, priority, data):
+        """
+        Reserva, no orçamento de memória, os bytes de imagem de uma nova
+        tarefa. Produtores esperam enquanto o orçamento estiver excedido;
+        tarefas de alta prioridade, interativas, nunca esperam.
+        :param priority Prioridade de execução da tarefa.
+        :param data Dados da tarefa.
+        """
+        data._bytes = footprint(data)
+        cls._budget.acquire(data._bytes, priority < high)
+
+    @classmethod
+    def account(cls, data):
+        """
+        Atualiza a memória reservada por uma tarefa após a execução
+        de um estágio, que pode ter produzido novas imagens.
+        :param data Dados da tarefa.
+        """
+        size = footprint(data)
+        cls._budget.adjust(size - data._bytes)
+        data._bytes = size
+
+    @classmethod
+    def release(cls, data):
+        """
+        Libera a memória reservada por uma tarefa concluída.
+        :param data Dados da tarefa.
+        """
+        cls._budget.release(data._bytes)
+        data._bytes = 0
+
+def footprint(data):
+    """
+    Calcula a quantidade de bytes de imagem presentes nos dados de
+    uma tarefa: matrizes, imagens e mapas de componentes.
+    :param data Dados da tarefa.
+    :return int
+    """
+    total = 0
+
+    for value in data._raw.values():
+        value = getattr(value, "img", value)
+        value = getattr(value, "raw", value)
+
+        if isinstance(value, numpy.ndarray):
+            total = total + value.nbytes
+
+    return total
@@ -46,6 +46,7 @@ class Communication(object):
         if load <= stage <= process:
             if low <= self.priority <= high:
                 data = Container(**args)
+                Pipeline.admit(self.priority, data)
                 self._sent = self._sent + 1
                 Pipeline.push(stage, self.priority, self, data)
 
@@ -60,6 +61,7 @@ class Communication(object):
         :param response Resposta produzida pelo estágio.
         """
         data.update(**response)
+        Pipeline.release(data)
 
         if self.event and stage > -1:
             Event(stagename[stage]).post(data, self.context)
@@ -26,6 +26,7 @@ class Container(object):
         :return Container
         """
         self._raw = initial
+        self._bytes = 0
 
     def __getattr__(self, item):
         """
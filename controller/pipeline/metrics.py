@@ -0,0 +1,68 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""
+PSG - Tecnologia Aplicada
+
+Este é um módulo utilizado para contagem de falhas em
+plantações de cana-de-açúcar através do uso de imagens
+aéreas capturadas por VANT's ou aparelhos similares.
+
+Este arquivo é responsável pelo desenho da interface do
+programa e também pela execução e apresentação dos
+resultados obtidos com a imagem fornecida.
+"""
+from threading import Lock
+
+class Metrics(object):
+    """
+    Armazena medidas de desempenho coletadas durante a execução
+    dos estágios do pipeline. Cada medida é acumulada por estágio
+    e pode ser consultada pela sua média.
+    """
+    _data = {}
+    _lock = Lock()
+
+    @classmethod
+    def record(cls, stage, **values):
+        """
+        Registra novas medidas para um estágio.
+        :param stage Identificador do estágio.
+        :param values Medidas a serem acumuladas.
+        """
+        with cls._lock:
+            for name, value in values.iteritems():
+                total, count = cls._data.get((stage, name), (0.0, 0))
+                cls._data[stage, name] = total + value, count + 1
+
+    @classmethod
+    def mean(cls, stage, name):
+        """
+        Calcula a média de uma medida de um estágio.
+        :param stage Identificador do estágio.
+        :param name Nome da medida.
+        :return float
+        """
+        with cls._lock:
+            total, count = cls._data.get((stage, name), (0.0, 0))
+
+        return total / count if count else 0.0
+
+    @classmethod
+    def report(cls):
+        """
+        Produz um relatório com a média de todas as medidas
+        registradas até o momento.
+        :return dict
+        """
+        with cls._lock:
+            keys = list(cls._data.keys())
+
+        return {key: cls.mean(*key) for key in keys}
+
+    @classmethod
+    def reset(cls):
+        """
+        Descarta todas as medidas registradas.
+        """
+        with cls._lock:
+            cls._data.clear()
@@ -11,8 +11,9 @@ Este arquivo é responsável pelo desenho da interface do
 programa e também pela execução e apresentação dos
 resultados obtidos com a imagem fornecida.
 """
+from core.resultcache import ResultCache
 from ..event import Event
-from . import Pipeline, load, process, low, high, stagename
+from . import Pipeline, load, segment, process, low, high, stagename
 from .communication import Communication
 from .container import Container
 
@@ -33,6 +34,7 @@ class MultiStage(Communication):
         """
         Communication.__init__(self, priority, **context)
         self.first, self.last = first, last
+        self._cached = {}
 
     def push(self, **args):
         """
@@ -43,9 +45,67 @@ class MultiStage(Communication):
         if load <= self.first <= self.last <= process:
             if low <= self.priority <= high:
                 data = Container(**args)
+                key = self.key(**args)
+
+                if key is not None and self.recall(key, data):
+                    return
+
+                Pipeline.admit(self.priority, data)
                 self._sent = self._sent + 1
+
+                if key is not None:
+                    self._cached[id(data)] = [key, None]
+
                 Pipeline.push(self.first, self.priority, self, data)
 
+    def key(self, patch = None, distance = None, train = None, angle = None, **args):
+        """
+        Calcula o endereço do resultado de uma tarefa no armazenamento
+        de resultados. Apenas tarefas que executam da segmentação ao
+        processamento, com o conjunto de treinamento padrão, são
+        armazenadas.
+        :param patch Retalho a ser processado.
+        :param distance Distância entre as linhas de plantação.
+        :param train Conjunto de treinamento próprio da tarefa.
+        :param angle Ângulo das linhas de plantação, caso conhecido.
+        :return str|None
+        """
+        if self.first != segment or self.last != process or not ResultCache.enabled():
+            return None
+
+        if patch is None or distance is None or train is not None:
+            return None
+
+        return ResultCache.key(patch, distance, angle)
+
+    def recall(self, key, data):
+        """
+        Conclui uma tarefa com um resultado armazenado, sem que ela passe
+        pelo pipeline. Os eventos de cada estágio são disparados como se
+        a tarefa tivesse sido executada.
+        :param key Endereço do resultado.
+        :param data Dados de execução da tarefa.
+        :return bool A tarefa foi concluída?
+        """
+        result = ResultCache.load(key)
+
+        if result is None:
+            return False
+
+        self._sent = self._sent + 1
+        data.update(image = result.pop("mask"))
+
+        if self.event:
+            Event(stagename[segment]).post(data, self.context)
+
+        data.update(**result)
+
+        if self.event:
+            Event(stagename[process]).post(data, self.context)
+
+        self._ready.put( (process, data) )
+        return True
+
     def notify(self, stage, data, response):
         """
         Recebe a resposta de um estágio do pipeline e
@@ -58,14 +118,35 @@ class MultiStage(Communication):
         """
         data.update(**response)
 
+        if id(data) in self._cached:
+            self.remember(stage, data)
+
         if self.event and stage > -1:
             Event(stagename[stage]).post(data, self.context)
 
         if -1 < stage < self.last:
+            Pipeline.account(data)
             Pipeline.push(stage + 1, self.priority, self, data)
         else:
+            Pipeline.release(data)
             self._ready.put( (stage, data) )
 
+    def remember(self, stage, data):
+        """
+        Guarda a máscara produzida pela segmentação e, ao final do
+        processamento, armazena o resultado da tarefa.
+        :param stage Estágio de origem da resposta.
+        :param data Dados armazenados pela execução.
+        """
+        if stage == segment:
+            self._cached[id(data)][1] = data.image
+            return
+
+        key, mask = self._cached.pop(id(data))
+
+        if stage == process and mask is not None:
+            ResultCache.store(key, mask, data)
+
     def pop(self):
         """
         Resgata da pilha valores retornados pelos estágios
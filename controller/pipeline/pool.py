@@ -0,0 +1,252 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""
+PSG - Tecnologia Aplicada
+
+Este é um módulo utilizado para contagem de falhas em
+plantações de cana-de-açúcar através do uso de imagens
+aéreas capturadas por VANT's ou aparelhos similares.
+
+Este arquivo é responsável pelo desenho da interface do
+programa e também pela execução e apresentação dos
+resultados obtidos com a imagem fornecida.
+"""
+from multiprocessing import Process, Pipe, RawArray
+from cStringIO import StringIO
+from core.patchwork import Patch
+from core.image import Image
+from .container import Container
+import threading
+import traceback
+import cPickle
+import ctypes
+import config
+import numpy
+
+__all__ = [
+    "Arena", "Worker",
+]
+
+class Arena(object):
+    """
+    Região de memória compartilhada entre processos. Matrizes grandes
+    são copiadas para a região e apenas sua posição é enviada ao outro
+    processo, que as acessa sem que seus dados sejam serializados.
+    """
+    align = 64
+
+    def __init__(self, buffer):
+        """
+        Inicializa uma nova instância do objeto.
+        :param buffer Memória compartilhada a ser administrada.
+        :return Arena
+        """
+        self.buffer = buffer
+        self.raw = numpy.frombuffer(buffer, numpy.uint8)
+        self.offset = 0
+
+    @classmethod
+    def create(cls, size):
+        """
+        Aloca uma nova região de memória compartilhada.
+        :param size Tamanho da região em bytes.
+        :return Arena
+        """
+        return cls(RawArray(ctypes.c_uint8, size))
+
+    def reset(self):
+        """
+        Libera toda a região para uma nova mensagem.
+        """
+        self.offset = 0
+
+    def write(self, array):
+        """
+        Copia uma matriz para a região.
+        :param array Matriz a ser copiada.
+        :return int|None Posição da matriz, ou None caso não haja espaço.
+        """
+        start = -(-self.offset // self.align) * self.align
+
+        if start + array.nbytes > len(self.raw):
+            return None
+
+        self.offset = start + array.nbytes
+        self.view(start, array.dtype, array.shape)[...] = array
+
+        return start
+
+    def view(self, offset, dtype, shape):
+        """
+        Acessa uma matriz armazenada na região, sem copiá-la.
+        :param offset Posição da matriz.
+        :param dtype Tipo dos elementos da matriz.
+        :param shape Formato da matriz.
+        :return numpy.ndarray
+        """
+        dtype = numpy.dtype(dtype)
+        count = int(numpy.prod(shape)) * dtype.itemsize
+
+        return self.raw[offset:offset + count].view(dtype).reshape(shape)
+
+    def dumps(self, obj):
+        """
+        Serializa um objeto. Matrizes grandes são desviadas para a
+        região compartilhada, e retalhos são enviados como imagens
+        simples acompanhadas de sua máscara de pixels válidos.
+        :param obj Objeto a ser serializado.
+        :return str
+        """
+        memo, keep = {}, []
+        stream = StringIO()
+        pickler = cPickle.Pickler(stream, 2)
+
+        def persistent(value):
+            if isinstance(value, Patch):
+                keep.append(value)
+                return "patch", value.raw, value.valid
+
+            if not isinstance(value, numpy.ndarray) or value.dtype.hasobject \
+            or value.nbytes < config.shmleast:
+                return None
+
+            if id(value) not in memo:
+                offset = self.write(numpy.ascontiguousarray(value))
+                memo[id(value)] = None if offset is None \
+                    else ("array", offset, value.dtype, value.shape)
+                keep.append(value)
+
+            return memo[id(value)]
+
+        pickler.persistent_id = persistent
+        pickler.dump(obj)
+
+        return stream.getvalue()
+
+    def loads(self, message, copy = True):
+        """
+        Reconstrói um objeto serializado por dumps.
+        :param message Objeto serializado.
+        :param copy As matrizes devem ser copiadas para fora da região?
+        :return mixed
+        """
+        unpickler = cPickle.Unpickler(StringIO(message))
+
+        def persistent(pid):
+            if pid[0] == "patch":
+                image = Image(pid[1])
+                image.valid = pid[2]
+                return image
+
+            array = self.view(*pid[1:])
+            return array.copy() if copy else array
+
+        unpickler.persistent_load = persistent
+        return unpickler.load()
+
+def serve(conn, inbuf, outbuf):
+    """
+    Laço de execução de um processo de trabalho. Cada mensagem traz
+    a função de um estágio e os dados de suas tarefas; a resposta é
+    devolvida pelo mesmo canal.
+    :param conn Canal de comunicação com o processo principal.
+    :param inbuf Memória compartilhada das mensagens recebidas.
+    :param outbuf Memória compartilhada das respostas enviadas.
+    """
+    inarena, outarena = Arena(inbuf), Arena(outbuf)
+
+    while True:
+        message = conn.recv_bytes()
+
+        if not message:
+            break
+
+        function, batch, datas = inarena.loads(message, copy = False)
+        outarena.reset()
+
+        try:
+            datas = [Container(**data) for data in datas]
+            result = "done", function(datas) if batch else [function(datas[0])]
+        except:
+            result = "error", traceback.format_exc()
+
+        conn.send_bytes(outarena.dumps(result))
+
+class Worker(object):
+    """
+    Processo de trabalho de um estágio do pipeline. As tarefas são
+    executadas em outro processo, fora do alcance do GIL, e as imagens
+    trafegam por memória compartilhada. Caso o processo morra, ele é
+    criado novamente na próxima execução.
+    """
+
+    def __init__(self, size = None):
+        """
+        Inicializa uma nova instância do objeto e cria o processo.
+        :param size Tamanho, em bytes, de cada região compartilhada. Sem
+            regiões, todas as matrizes trafegam pelo canal de comunicação.
+        :return Worker
+        """
+        self.size = config.shmsize if size is None else size
+        self.input, self.output = Arena.create(self.size), Arena.create(self.size)
+        self.lock = threading.Lock()
+        self.spawn()
+
+    def spawn(self):
+        """
+        Cria o processo de trabalho, que reaproveita as regiões de
+        memória compartilhada já alocadas.
+        """
+        self.conn, child = Pipe()
+
+        self.process = Process(
+            target = serve,
+            args = (child, self.input.buffer, self.output.buffer)
+        )
+
+        self.process.daemon = True
+        self.process.start()
+
+    def run(self, function, datas, batch = None):
+        """
+        Executa a função de um estágio no processo de trabalho.
+        :param function Função a ser executada.
+        :param datas Dados de execução das tarefas.
+        :param batch A função trabalha em lotes?
+        :return list Respostas de cada uma das tarefas.
+        """
+        with self.lock:
+            if not self.process.is_alive():
+                self.spawn()
+
+            self.input.reset()
+            message = self.input.dumps(
+                (function, bool(batch), [data._raw for data in datas])
+            )
+
+            # A morte do processo durante a execução faz as tarefas falharem,
+            # e um novo processo é criado para as próximas.
+            try:
+                self.conn.send_bytes(message)
+                status, value = self.output.loads(self.conn.recv_bytes())
+            except (EOFError, IOError):
+                self.process.join()
+                self.spawn()
+                raise RuntimeError("Worker process died.")
+
+        if status == "error":
+            raise RuntimeError(value)
+
+        return value
+
+    def close(self):
+        """
+        Finaliza o processo de trabalho.
+        """
+        with self.lock:
+            try:
+                self.conn.send_bytes("")
+            except IOError:
+                pass
+
+        self.process.join()
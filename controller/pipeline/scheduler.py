@@ -0,0 +1,196 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""
+PSG - Tecnologia Aplicada
+
+Este é um módulo utilizado para contagem de falhas em
+plantações de cana-de-açúcar através do uso de imagens
+aéreas capturadas por VANT's ou aparelhos similares.
+
+Este arquivo é responsável pelo desenho da interface do
+programa e também pela execução e apresentação dos
+resultados obtidos com a imagem fornecida.
+"""
+from collections import deque
+from threading import Condition, Lock
+from .metrics import Metrics
+import config
+import time
+
+__all__ = [
+    "Scheduler", "Budget",
+]
+
+class Scheduler(object):
+    """
+    Fila de prioridades de um estágio do pipeline. Os trabalhadores
+    dormem enquanto não houver tarefas, e tarefas de baixa prioridade
+    envelhecem enquanto esperam, para que nunca sejam preteridas
+    indefinidamente.
+    """
+
+    def __init__(self, stage, levels = 3, aging = None, bound = None):
+        """
+        Inicializa uma nova instância do objeto.
+        :param stage Identificador do estágio atendido pela fila.
+        :param levels Quantidade de níveis de prioridade.
+        :param aging Tempo de espera, em segundos, para que uma tarefa
+            suba um nível de prioridade. Por padrão, o da configuração.
+        :param bound Quantidade máxima de tarefas à espera. O valor 0
+            não limita a fila. Por padrão, o da configuração.
+        :return Scheduler
+        """
+        self.stage = stage
+        self.aging = aging or config.aging
+        self.bound = config.queuesize if bound is None else bound
+        self.alive = True
+        self.round = 0
+
+        lock = Lock()
+        self._cond = Condition(lock)
+        self._space = Condition(lock)
+        self._queue = [deque() for i in xrange(levels)]
+
+    def __len__(self):
+        """
+        Contagem de tarefas à espera na fila.
+        :return int
+        """
+        with self._cond:
+            return sum(len(queue) for queue in self._queue)
+
+    def put(self, priority, task, block = True):
+        """
+        Adiciona uma tarefa à fila e acorda um trabalhador. Caso a fila
+        esteja cheia, o produtor espera até que haja espaço.
+        :param priority Prioridade da tarefa.
+        :param task Tarefa a ser adicionada.
+        :param block O produtor deve esperar por espaço na fila?
+        """
+        with self._cond:
+            while block and self.alive and self.bound \
+            and sum(len(queue) for queue in self._queue) >= self.bound:
+                self._space.wait()
+
+            self._queue[priority].append((time.time(), task))
+            self._cond.notify()
+
+    def take(self, count = 1):
+        """
+        Retira até  count  tarefas da fila. Caso a fila esteja vazia, o
+        trabalhador dorme até que uma tarefa chegue ou a fila seja fechada.
+        As tarefas são escolhidas pela prioridade acrescida do tempo de
+        espera; entre prioridades iguais, vence a tarefa mais antiga.
+        :param count Quantidade máxima de tarefas.
+        :return list Tarefas retiradas. Vazia se a fila foi fechada ou
+            se os trabalhadores foram acordados por wake.
+        """
+        tasks, latency = [], []
+
+        with self._cond:
+            start = time.time()
+            current = self.round
+
+            while self.alive and not any(self._queue) and current == self.round:
+                self._cond.wait()
+
+            now = time.time()
+            idle = now - start
+
+            while len(tasks) < count and any(self._queue):
+                level = max(
+                    (p for p, queue in enumerate(self._queue) if queue),
+                    key = lambda p: (p + (now - self._queue[p][0][0]) // self.aging, p)
+                )
+
+                stamp, task = self._queue[level].popleft()
+                latency.append(now - stamp)
+                tasks.append(task)
+
+            self._space.notify(len(tasks))
+
+        Metrics.record(self.stage, idle = idle)
+
+        for value in latency:
+            Metrics.record(self.stage, latency = value)
+
+        return tasks
+
+    def wake(self):
+        """
+        Acorda todos os trabalhadores adormecidos, que retornam sem
+        tarefas caso a fila continue vazia.
+        """
+        with self._cond:
+            self.round = self.round + 1
+            self._cond.notify_all()
+
+    def close(self):
+        """
+        Fecha a fila e acorda todos os trabalhadores adormecidos.
+        """
+        with self._cond:
+            self.alive = False
+            self._cond.notify_all()
+            self._space.notify_all()
+
+class Budget(object):
+    """
+    Orçamento de memória das imagens em trânsito pelo pipeline. Novas
+    tarefas só são admitidas enquanto o total de bytes de imagem das
+    tarefas ainda não concluídas couber no orçamento.
+    """
+
+    def __init__(self, limit = None):
+        """
+        Inicializa uma nova instância do objeto.
+        :param limit Orçamento em bytes. O valor 0 não limita a memória.
+            Por padrão, o da configuração.
+        :return Budget
+        """
+        self.limit = config.budget if limit is None else limit
+        self.used = 0
+        self.alive = True
+
+        self._cond = Condition()
+
+    def acquire(self, amount, block = True):
+        """
+        Reserva memória para uma nova tarefa. Uma tarefa é sempre admitida
+        quando nenhuma outra está em trânsito, mesmo que exceda o orçamento.
+        :param amount Quantidade de bytes a ser reservada.
+        :param block O produtor deve esperar pela liberação de memória?
+        """
+        with self._cond:
+            while block and self.alive and self.limit and self.used \
+            and self.used + amount > self.limit:
+                self._cond.wait()
+
+            self.used = self.used + amount
+
+    def adjust(self, amount):
+        """
+        Corrige, sem esperar, a memória reservada por uma tarefa em trânsito.
+        Valores negativos liberam memória e acordam os produtores.
+        :param amount Variação em bytes.
+        """
+        with self._cond:
+            self.used = self.used + amount
+
+            if amount < 0:
+                self._cond.notify_all()
+
+    def release(self, amount):
+        """
+        Libera a memória reservada por uma tarefa concluída.
+        :param amount Quantidade de bytes a ser liberada.
+        """
+        self.adjust(-amount)
+
+    def close(self):
+        """
+        Libera todos os produtores à espera.
+        """
+        with self._cond:
+            self.alive = False
+            self._cond.notify_all()
@@ -41,6 +41,7 @@ class SingleStage(Communication):
         if load <= self.stage <= process:
             if low <= self.priority <= high:
                 data = Container(**args)
+                Pipeline.admit(self.priority, data)
                 self._sent = self._sent + 1
                 Pipeline.push(self.stage, self.priority, self, data)
 
@@ -44,6 +44,7 @@ class Control(object):
         self.last = None
 
         self.train = ([],[])
+        self.masks = {}
         self.sp = Spectator(self.tgt, (584,393))
         self.sp.update()
 
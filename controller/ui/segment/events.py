@@ -15,9 +15,13 @@ from controller.pipeline import high, segment, process
 from controller.pipeline.singlestage import SingleStage
 from controller.pipeline.multistage import MultiStage
 from core.patchwork import PatchWork, Patch
+from core.segmentator import Segmentator, digest
+from core.trainset import TrainSet
 from controller import ThreadWrapper
 from core.image import Image
+from config import root
 import cv2 as cv
+import os
 
 
 def update(control, canvas):
@@ -140,25 +144,44 @@ def incrementa(button, control, e):
 
     x = x + control.train[0] + control.train[1]
     y = y + [0] * len(control.train[0]) + [255] * len(control.train[1])
+    seg, changed = None, None
+    before = digest(root + "/trainset.csv", root + os.sep + 'patchtrain.csv')
     if len(x) > 2: 
-      with open('patchtrain.csv','a') as f:
-        for i in range(len(x)):
-            tstr = ' '.join(map(str,x[i])) + ' '+ str(y[i])+'\n'
-            f.write(tstr)
+      TrainSet(root + os.sep + 'patchtrain.csv').append(x, y)
+      seg, changed = Segmentator.increment(x, y)
             
 
+    # Apenas os retalhos que possuem cores cuja classe foi alterada
+    # pelos novos casos precisam ser segmentados novamente. Máscaras
+    # produzidas por outra versão do conjunto de treinamento não são
+    # reaproveitadas.
+    keep = [
+        elem for elem in control.selected
+            if seg is not None and elem.pos in control.masks
+            and control.masks[elem.pos][0] == before
+            and not seg.affects(elem[0], changed)
+    ]
+
     for elem in control.selected:
-        comm.push(patch = elem[0], pos = elem.pos)
+        if elem not in keep:
+            comm.push(patch = elem[0], pos = elem.pos)
 
     pwork = PatchWork(control.parent.im.psize, img)
     pwork.shred(0)
 
+    # As máscaras reaproveitadas continuam válidas para a nova versão
+    # do conjunto de treinamento.
+    for elem in keep:
+        control.masks[elem.pos] = seg.digest, control.masks[elem.pos][1]
+        pwork.access(elem.pos - control.diff).sew(control.masks[elem.pos][1].colorize())
+
     control.last = control.sp.im
     control.sp.im = pwork
     update(control, control.win.canvas)
 
     while comm.pendent:
         data = comm.pop()
+        control.masks[data.pos] = data.digest, data.image
         pwork.access(data.pos - control.diff).sew(data.image.colorize())
         update(control, control.win.canvas)
     
@@ -196,10 +219,9 @@ def sobreescreve(button, control, e):
     x = x + control.train[0] + control.train[1]
     y = y + [0] * len(control.train[0]) + [255] * len(control.train[1])
     if len(x) > 2: 
-      with open('patchtrain.csv','w') as f:
-        for i in range(len(x)):
-            tstr = ' '.join(map(str,x[i])) + ' '+ str(y[i])+'\n'
-            f.write(tstr)
+      TrainSet(root + os.sep + 'patchtrain.csv').write(x, y)
+      Segmentator.invalidate()
+      control.masks.clear()
             
 
     for elem in control.selected:
@@ -214,6 +236,7 @@ def sobreescreve(button, control, e):
 
     while comm.pendent:
         data = comm.pop()
+        control.masks[data.pos] = data.digest, data.image
         pwork.access(data.pos - control.diff).sew(data.image.colorize())
         update(control, control.win.canvas)
 @ThreadWrapper
@@ -263,6 +286,7 @@ def test(button, control, e):
 
     while comm.pendent:
         data = comm.pop()
+        control.masks[data.pos] = data.digest, data.image
         pwork.access(data.pos - control.diff).sew(data.image.colorize())
         update(control, control.win.canvas)
 
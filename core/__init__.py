@@ -15,10 +15,12 @@ from .segmentator import Segmentator
 from .component import ComponentList
 from .image import Image
 from .line import LineList
+import config
 
 __all__ = [
     "LoadImage",
     "SegmentImage",
+    "SegmentImages",
     "ProcessImage",
     "SaveImage",
 ]
@@ -36,16 +38,106 @@ def SegmentImage(data):
     """
     Executa a segmentação da imagem.
     :param data Dados de execução.
-    :return Image, Map Lista de componentes.
+    :return Image, Map Lista de componentes, e a assinatura do
+        conjunto de treinamento utilizado.
     """
     try:
         seg = Segmentator.train(train = data.train)
     except:
-        seg = Segmentator.train()
-    image = seg.apply(data.patch)
-    comp, compmap, inverted = ComponentList.load(image)
+        seg = Segmentator.shared()
 
-    return dict(image = image, compmap = compmap, inverted = inverted)
+    stats = {}
+    valid = getattr(data.patch, "valid", None)
+    image = seg.apply(data.patch, stats, valid)
+    comp, compmap, inverted = ComponentList.load(image, valid, Angle(data))
+
+    return dict(image = image, compmap = compmap, inverted = inverted,
+        digest = seg.digest, metrics = stats)
+
+def SegmentImages(datas):
+    """
+    Executa a segmentação de várias imagens com uma única
+    classificação vetorizada. Uma imagem que falhe não impede
+    a entrega das demais.
+    :param datas Lista de dados de execução.
+    :return list Respostas de cada uma das imagens. A resposta de
+        uma imagem que falhou é None.
+    """
+    responses = [None] * len(datas)
+    batch = []
+
+    for i, data in enumerate(datas):
+        try:
+            data.train
+        except KeyError:
+            batch.append(i)
+            continue
+
+        try:
+            responses[i] = SegmentImage(data)
+        except Exception:
+            responses[i] = None
+
+    stats = {}
+    seg = Segmentator.shared()
+    valid = [getattr(datas[i].patch, "valid", None) for i in batch]
+
+    # Caso a classificação conjunta falhe, as imagens são segmentadas
+    # individualmente, e apenas a imagem defeituosa é perdida.
+    try:
+        images = seg.apply_many([datas[i].patch for i in batch], stats, valid)
+    except Exception:
+        images = []
+
+        for i, v in zip(batch, valid):
+            try:
+                images.append(seg.apply(datas[i].patch, stats, v))
+            except Exception:
+                images.append(None)
+
+    for i, image, v in zip(batch, images, valid):
+        if image is None:
+            continue
+
+        try:
+            comp, compmap, inverted = ComponentList.load(image, v, Angle(datas[i]))
+            responses[i] = dict(image = image, compmap = compmap, inverted = inverted,
+                digest = seg.digest, metrics = stats)
+        except Exception:
+            responses[i] = None
+
+    return responses
+
+def Angle(data):
+    """
+    Recupera o ângulo das linhas estimado para toda a plantação.
+    :param data Dados de execução.
+    :return float|None Ângulo das linhas, caso tenha sido estimado.
+    """
+    try:
+        return data.angle
+    except KeyError:
+        return None
+
+def FindLines(cmap, engine = None):
+    """
+    Encontra as linhas de plantação presentes no mapa de componentes.
+    :param cmap Mapa de componentes.
+    :param engine Método de detecção. Por padrão, o da configuração.
+    :return LineList Linhas encontradas.
+    """
+    cmap = cmap.aligned
+
+    if (engine or config.lineengine) == "profile":
+        lines = LineList.detect(cmap)
+
+        if lines.count:
+            return lines
+
+    lines = LineList.first(cmap, cmap.comp[1])
+    lines.complete()
+
+    return lines
 
 def ProcessImage(data):
     """
@@ -55,12 +147,11 @@ def ProcessImage(data):
     :param data Dados de execução.
     :return Image, float, float Porcentagem e metragem de falhas.
     """
-    lines = LineList.first(data.compmap, data.compmap.comp[1])
-    lines.complete()
+    lines = FindLines(data.compmap)
 
-    pct, mtrs, crop, image = lines.error(data.distance, data.compmap.inverted)
+    pct, mtrs, crop, image, gaps = lines.error(data.distance, data.compmap.inverted)
 
-    return dict(image = image, percent = pct, meters = mtrs, crop = crop)
+    return dict(image = image, percent = pct, meters = mtrs, crop = crop, gaps = gaps)
 
 def SaveImage(original, image):
     """
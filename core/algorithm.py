@@ -14,6 +14,8 @@ resultados obtidos com a imagem fornecida.
 from controller.pipeline import segment, process, normal
 from controller.pipeline.multistage import MultiStage
 from controller import ThreadWrapper
+from .segmentator import Segmentator
+from . import orientation
 
 class Algorithm(object):
     """
@@ -30,6 +32,21 @@ class Algorithm(object):
         self.patch = pwork.shred()
         self.pwork = pwork
 
+    def orientation(self, proportion = .25):
+        """
+        Estima, uma única vez para toda a plantação, a direção dominante
+        das linhas. A estimativa é feita sobre uma versão reduzida da
+        imagem segmentada, e todos os retalhos a compartilham. A camada
+        original da colcha é utilizada, qualquer que seja a selecionada.
+        :param proportion Proporção de redução da imagem.
+        :return float Ângulo das linhas.
+        """
+        image = self.pwork[0].resize(proportion)
+        valid = image.binarize(thresh = 25).raw > 0
+        mask = Segmentator.shared().apply(image, valid = valid)
+
+        return orientation.estimate(mask.raw)[0]
+
     @ThreadWrapper
     def run(self, control, distance):
         """
@@ -39,9 +56,10 @@ class Algorithm(object):
         """
         #comm = MultiStage(normal, segment, process)
         comm = MultiStage(normal, segment, process, control = control)
+        angle = self.orientation()
 
         for i, p in enumerate(self.patch):
             p.select(0)
-            comm.push(patch = p, distance = distance, id = i, address = control.pg.address)
+            comm.push(patch = p, distance = distance, id = i, address = control.pg.address, angle = angle)
 
         comm.consume()
@@ -0,0 +1,227 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""
+PSG - Tecnologia Aplicada
+
+Este é um módulo utilizado para contagem de falhas em
+plantações de cana-de-açúcar através do uso de imagens
+aéreas capturadas por VANT's ou aparelhos similares.
+
+Este arquivo é responsável pelo desenho da interface do
+programa e também pela execução e apresentação dos
+resultados obtidos com a imagem fornecida.
+"""
+from sklearn.neighbors import KNeighborsClassifier
+import numpy
+
+__all__ = [
+    "backends", "create",
+    "Neighbors", "Centroid", "Gaussian", "Mahalanobis", "Linear",
+]
+
+class Neighbors(object):
+    """
+    Classificador baseado nos vizinhos mais próximos. Cada cor
+    recebe a classe da maioria dos seus  k  casos de treinamento
+    mais próximos.
+    """
+
+    def __init__(self, k = 1):
+        """
+        Inicializa e cria uma nova instância do objeto.
+        :param k Número de vizinhos mais próximos a ser considerado.
+        :return Neighbors
+        """
+        self.knn = KNeighborsClassifier(
+            n_neighbors = k,
+            warn_on_equidistant = False
+        )
+
+    def fit(self, x, y):
+        """
+        Treina o classificador.
+        :param x Entradas de casos de treinamento.
+        :param y Classes dos casos de treinamento.
+        """
+        self.knn.fit(x, y)
+        self.y = numpy.asarray(y)
+
+    def nearest(self, x):
+        """
+        Localiza o caso de treinamento mais próximo de cada cor.
+        :param x Matriz (N, 3) de cores.
+        :return numpy.ndarray, numpy.ndarray Distâncias e classes.
+        """
+        dist, index = self.knn.kneighbors(x, 1)
+        label = numpy.array(self.y[index[:, 0]], dtype = numpy.uint8)
+        return numpy.array(dist[:, 0], dtype = numpy.float32), label
+
+    def predict(self, x):
+        """
+        Classifica uma lista de cores.
+        :param x Matriz (N, 3) de cores a serem classificadas.
+        :return numpy.ndarray
+        """
+        return numpy.array(self.knn.predict(x), dtype = numpy.uint8)
+
+class Centroid(object):
+    """
+    Classificador pelo centróide mais próximo. Cada classe é
+    representada apenas pela média de seus casos de treinamento.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Inicializa e cria uma nova instância do objeto.
+        :return Centroid
+        """
+        self.classes = None
+        self.means = None
+
+    def fit(self, x, y):
+        """
+        Treina o classificador.
+        :param x Entradas de casos de treinamento.
+        :param y Classes dos casos de treinamento.
+        """
+        x, y = numpy.asarray(x, numpy.float64), numpy.asarray(y)
+
+        self.classes = numpy.unique(y)
+        self.means = numpy.array([x[y == c].mean(0) for c in self.classes])
+
+    def score(self, x):
+        """
+        Calcula a pontuação de cada cor para cada uma das classes.
+        Quanto maior a pontuação, mais provável é a classe.
+        :param x Matriz (N, 3) de cores.
+        :return numpy.ndarray Matriz (N, C) de pontuações.
+        """
+        x = numpy.asarray(x, numpy.float64)
+        return -numpy.array([((x - m) ** 2).sum(1) for m in self.means]).T
+
+    def predict(self, x):
+        """
+        Classifica uma lista de cores.
+        :param x Matriz (N, 3) de cores a serem classificadas.
+        :return numpy.ndarray
+        """
+        index = numpy.argmax(self.score(x), axis = 1)
+        return numpy.array(self.classes[index], dtype = numpy.uint8)
+
+class Mahalanobis(Centroid):
+    """
+    Classificador pela menor distância de Mahalanobis. Cada classe
+    é representada pela média e pela covariância de seus casos de
+    treinamento.
+    """
+
+    def fit(self, x, y):
+        """
+        Treina o classificador.
+        :param x Entradas de casos de treinamento.
+        :param y Classes dos casos de treinamento.
+        """
+        super(Mahalanobis, self).fit(x, y)
+        x, y = numpy.asarray(x, numpy.float64), numpy.asarray(y)
+
+        # A regularização evita matrizes singulares quando uma classe
+        # possui poucos casos ou cores com canais constantes.
+        covs = [numpy.cov(x[y == c].T) + numpy.eye(3) for c in self.classes]
+
+        self.inv = numpy.array([numpy.linalg.inv(c) for c in covs])
+        self.logdet = numpy.array([numpy.linalg.slogdet(c)[1] for c in covs])
+        self.prior = numpy.array([numpy.mean(y == c) for c in self.classes])
+
+    def score(self, x):
+        """
+        Calcula a pontuação de cada cor para cada uma das classes.
+        Quanto maior a pontuação, mais provável é a classe.
+        :param x Matriz (N, 3) de cores.
+        :return numpy.ndarray Matriz (N, C) de pontuações.
+        """
+        x = numpy.asarray(x, numpy.float64)
+
+        return -numpy.array([
+            (numpy.dot(x - m, inv) * (x - m)).sum(1)
+                for m, inv in zip(self.means, self.inv)
+        ]).T
+
+class Gaussian(Mahalanobis):
+    """
+    Classificador gaussiano. Cada classe é modelada por uma
+    distribuição normal e a cor recebe a classe de maior
+    verossimilhança a posteriori.
+    """
+
+    def score(self, x):
+        """
+        Calcula a pontuação de cada cor para cada uma das classes.
+        Quanto maior a pontuação, mais provável é a classe.
+        :param x Matriz (N, 3) de cores.
+        :return numpy.ndarray Matriz (N, C) de pontuações.
+        """
+        score = super(Gaussian, self).score(x)
+        return .5 * (score - self.logdet) + numpy.log(self.prior)
+
+class Linear(object):
+    """
+    Classificador linear de duas classes. As cores são projetadas
+    sobre o discriminante de Fisher e separadas por um limiar.
+    """
+
+    def __init__(self, **kwargs):
+        """
+        Inicializa e cria uma nova instância do objeto.
+        :return Linear
+        """
+        self.classes = None
+        self.weight = None
+        self.thresh = None
+
+    def fit(self, x, y):
+        """
+        Treina o classificador.
+        :param x Entradas de casos de treinamento.
+        :param y Classes dos casos de treinamento.
+        """
+        x, y = numpy.asarray(x, numpy.float64), numpy.asarray(y)
+        self.classes = numpy.unique(y)
+
+        if len(self.classes) != 2:
+            raise ValueError("Linear classifier needs exactly two classes.")
+
+        a, b = [x[y == c] for c in self.classes]
+        within = numpy.cov(a.T) * len(a) + numpy.cov(b.T) * len(b) + numpy.eye(3)
+
+        self.weight = numpy.linalg.solve(within, b.mean(0) - a.mean(0))
+        self.thresh = numpy.dot(self.weight, (a.mean(0) + b.mean(0)) / 2.)
+
+    def predict(self, x):
+        """
+        Classifica uma lista de cores.
+        :param x Matriz (N, 3) de cores a serem classificadas.
+        :return numpy.ndarray
+        """
+        side = numpy.dot(numpy.asarray(x, numpy.float64), self.weight) > self.thresh
+        return numpy.array(self.classes[side.astype(int)], dtype = numpy.uint8)
+
+backends = {
+    "knn": Neighbors,
+    "centroid": Centroid,
+    "mahalanobis": Mahalanobis,
+    "gaussian": Gaussian,
+    "linear": Linear,
+}
+
+def create(name, x, y, k = 1):
+    """
+    Cria e treina um classificador a partir de seu nome.
+    :param name Nome do classificador.
+    :param x Entradas de casos de treinamento.
+    :param y Classes dos casos de treinamento.
+    :param k Número de vizinhos mais próximos a ser considerado.
+    :return Classificador treinado.
+    """
+    model = backends[name](k = k)
+    model.fit(x, y)
+    return model
@@ -11,21 +11,28 @@ Este arquivo é responsável pelo desenho da interface do
 programa e também pela execução e apresentação dos
 resultados obtidos com a imagem fornecida.
 """
-import copy
-
 import cv2 as cv
 import numpy
+import math
+
+import config
 
 from .util import Point
 from .map import *
+from . import orientation
 
 
 class Component(object):
     """
     Armazena, protege e manipula todos os pontos de um componente conexo da
-    imagem. Cada componente é dado por uma lista de pontos, que juntos
-    descrevem o contorno do componente.
+    imagem. Cada componente é dado por uma matriz (N, 2) de pontos, que juntos
+    descrevem o contorno do componente. Componentes obtidos de uma imagem
+    de rótulos calculam seu contorno apenas quando necessário.
     """
+    __slots__ = (
+        "_array", "_points", "_moments", "_area", "labels", "label",
+        "box", "up", "down", "belief", "line",
+    )
     
     def __init__(self, contour):
         """
@@ -33,14 +40,115 @@ class Component(object):
         :param contour Lista de pontos que descrevem os contornos do componente.
         :return Component
         """
-        self.points = map(lambda p: Point(*p[0]), contour)
-        self.contour = contour
+        self._points = None
+        self._moments = None
+        self._area = None
+        self._array = numpy.reshape(contour, (-1, 2)).astype(numpy.int32)
+        self.labels, self.label = None, 0
                 
-        self.up = min(self.points, key = lambda pnt: pnt.y).y
-        self.down = max(self.points, key = lambda pnt: pnt.y).y
-        self.area = cv.contourArea(contour)
+        self.up = int(self._array[:, 1].min())
+        self.down = int(self._array[:, 1].max())
+        self.box = cv.boundingRect(self.contour)
         self.belief = self.down - self.up
         self.line = None
+
+    @classmethod
+    def fromstats(cls, labels, label, stats):
+        """
+        Cria um componente a partir de uma imagem de rótulos e das
+        estatísticas calculadas pela rotulação dos componentes conexos.
+        :param labels Imagem de rótulos.
+        :param label Rótulo do componente na imagem.
+        :param stats Estatísticas do componente: posição, tamanho e área.
+        :return Component
+        """
+        comp = cls.__new__(cls)
+        x, y, w, h = map(int, stats[:4])
+
+        comp._points = None
+        comp._moments = None
+        comp._area = None
+        comp._array = None
+        comp.labels, comp.label = labels, label
+
+        comp.up, comp.down = y, y + h - 1
+        comp.box = (x, y, w, h)
+        comp.belief = h - 1
+        comp.line = None
+
+        return comp
+
+    @property
+    def array(self):
+        """
+        Matriz (N, 2) de pontos do contorno do componente. Caso o
+        componente tenha sido obtido de uma imagem de rótulos, o
+        contorno é calculado somente sobre a região ocupada por ele.
+        :return numpy.ndarray
+        """
+        if self._array is None:
+            x, y, w, h = self.box
+            roi = numpy.uint8(self.labels[y:y + h, x:x + w] == self.label)
+            cts = cv.findContours(roi, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_NONE, offset = (x, y))[-2]
+            self._array = numpy.reshape(max(cts, key = len), (-1, 2)).astype(numpy.int32)
+
+        return self._array
+
+    @property
+    def contour(self):
+        """
+        Contorno do componente no formato utilizado pelo OpenCV.
+        :return numpy.ndarray
+        """
+        return numpy.reshape(self.array, (-1, 1, 2))
+
+    @property
+    def area(self):
+        """
+        Área delimitada pelo contorno do componente. A área do contorno,
+        e não a contagem de pixels, é a utilizada pela densidade das
+        linhas de plantação.
+        :return float
+        """
+        if self._area is None:
+            self._area = cv.contourArea(self.contour)
+
+        return self._area
+
+    @property
+    def points(self):
+        """
+        Lista de pontos que descrevem o contorno do componente. Os
+        objetos Point só são criados quando esta lista é solicitada.
+        :return list
+        """
+        if self._points is None:
+            self._points = map(lambda p: Point(*p), self.array.tolist())
+
+        return self._points
+
+    @property
+    def moments(self):
+        """
+        Somas de potências dos pontos do componente utilizadas pelo
+        ajuste polinomial de grau 2 das linhas: as somas de y elevado
+        de 0 a 4, seguidas das somas de x vezes y elevado de 0 a 2.
+        :return numpy.ndarray
+        """
+        if self._moments is None:
+            x, y = self.array.T.astype(numpy.float64)
+            power = y ** numpy.arange(5)[:, None]
+            self._moments = numpy.concatenate([power.sum(1), (power[:3] * x).sum(1)])
+
+        return self._moments
+
+    def relabel(self, labels, label):
+        """
+        Transfere o componente para uma nova imagem de rótulos.
+        :param labels Nova imagem de rótulos.
+        :param label Rótulo do componente na nova imagem.
+        """
+        self.labels, self.label = labels, label
     
     def draw(self, image, color):
         """
@@ -48,7 +156,13 @@ class Component(object):
         :param image Imagem alvo para o desenho da linha.
         :param color Cor a ser usada.
         """
-        cv.drawContours(image.raw, [self.contour], 0, color, -1)
+        if self.labels is None:
+            cv.drawContours(image.raw, [self.contour], 0, color, -1)
+            return
+
+        x, y, w, h = self.box
+        roi = image.raw[y:y + h, x:x + w]
+        roi[self.labels[y:y + h, x:x + w] == self.label] = color
         
 class ComponentList(object):
     """
@@ -64,6 +178,7 @@ class ComponentList(object):
         :return ComponentList
         """
         self.comps = list(lcomp)
+        self.labels = None
         
     def __getitem__(self, index):
         """
@@ -84,38 +199,74 @@ class ComponentList(object):
             yield component
 
     @classmethod
-    def load(cls, img):
+    def load(cls, img, valid = None, angle = None):
         """
         Encontra todos os componentes presentes na imagem dada, e
-        retorna a lista de todos os componentes.
+        retorna a lista de todos os componentes. As linhas de plantação
+        são alinhadas à vertical antes da rotulação, e são rastreadas
+        sobre o mapa  aligned ; o mapa retornado está no referencial da
+        imagem dada.
         :param img Imagem alvo da operação.
+        :param valid Máscara dos pixels com dados. Os demais são ignorados.
+        :param angle Ângulo das linhas. Estimado sobre a imagem se omitido.
         :return ComponentList, Map
         """
-        def generate():
-            yield img
-            yield img.transpose()
+        if valid is not None:
+            img = Image(numpy.where(valid, img.raw, 0).astype(img.raw.dtype))
+            valid = Image(valid.astype(numpy.uint8))
+
+        initial = valid
+
+        # A orientação das linhas é estimada sobre toda a máscara antes da
+        # rotulação; assim, os componentes são extraídos uma única vez.
+        if angle is None:
+            angle = orientation.estimate(img.raw)[0]
 
-        slopes = []
+        inverted = int(abs(angle) >= 45)
+        frame = None
 
-        for inv, image in enumerate(generate()):
-            raw = copy.deepcopy(image.raw)
-            cts = cv.findContours(raw, cv.RETR_EXTERNAL, cv.CHAIN_APPROX_NONE)[0]
+        if inverted:
+            img = img.transpose()
+            valid = valid.transpose() if valid is not None else None
+            angle = math.copysign(90, angle) - angle
 
-            lcomp = map(Component, cts)
-            lcomp = filter(lambda comp: comp.belief > 1, lcomp)
-            lcomp = cls(lcomp).sort()
+        if abs(angle) >= config.deskew:
+            frame = orientation.Frame(img.shape, angle)
+            valid = valid if valid is not None else Image(numpy.ones(img.raw.shape, numpy.uint8))
+            img = Image(frame.forward(img.raw))
+            valid = Image(frame.forward(valid.raw))
 
-            slopev = lcomp.slope()
-            slopes.append([slopev, lcomp, image.shape, inv])
+        lcomp = cls.label(img)
+        cmap = lcomp.map(img.shape, inverted)
+        cmap.frame = frame
 
-            if slopev > 1:
-                break
+        if valid is not None:
+            cmap.valid = valid.raw > 0
 
-        lcomp, shape, inverted = max(slopes, key = lambda el: el[0])[1:]
-        cmap = lcomp.map(shape, inverted)
+        if not inverted and frame is None:
+            return lcomp, cmap, inverted
 
-        return lcomp, cmap, inverted
+        # O mapa alinhado é mantido para o rastreamento, e seus rótulos são
+        # levados de volta ao referencial original.
+        return lcomp, cmap.unwarp(initial), inverted
     
+    @classmethod
+    def label(cls, img):
+        """
+        Rotula os componentes conexos da imagem dada em uma única
+        passagem. Os componentes são criados a partir das estatísticas
+        de cada rótulo, sem que seus contornos sejam calculados.
+        :param img Imagem alvo da operação.
+        :return ComponentList
+        """
+        count, labels, stats = cv.connectedComponentsWithStats(img.raw, connectivity = 8)[:3]
+        keep = numpy.flatnonzero(stats[1:, cv.CC_STAT_HEIGHT] > 2) + 1
+
+        lcomp = cls([Component.fromstats(labels, i, stats[i]) for i in keep]).sort()
+        lcomp.labels = labels
+
+        return lcomp
+
     @property
     def count(self):
         """
@@ -132,25 +283,9 @@ class ComponentList(object):
         :param inverted O mapa estará invertido?
         :return Map
         """
-        cmap = Map(self.comps, shape, inverted)
+        cmap = Map(self.comps, shape, inverted, self.labels)
         return cmap
 
-    def slope(self, count = 10):
-        """
-        Verifica a necessidade de rotação da imagem.
-        :param count Quantidade de componentes a serem analizados.
-        :return float Média de inclinação dos componentes.
-        """
-        func = lambda comp: numpy.poly1d(
-            numpy.polyfit(
-                *zip(*comp.points), deg = 1
-            )
-        )[0]
-
-        value = map(func, self.comps[1:count + 1])
-        
-        return sum(value) / float(count)
-    
     def sort(self, key = lambda c: c.belief, reverse = False):
         """
         Ordena os componentes de acordo com a confiança individual de cada
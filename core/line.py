@@ -46,6 +46,7 @@ class Line(ComponentList):
         self.up = min(comps, key = lambda comp: comp.up).up
         self.down = max(comps, key = lambda comp: comp.down).down
         self.neigh = {'right': (inf, None), 'left': (inf, None)}
+        self.__sums = numpy.sum([comp.moments for comp in comps], axis = 0)
         self.__polynom = None
 
         self.map = cmap
@@ -60,20 +61,15 @@ class Line(ComponentList):
         :param direction Direção em que a procura foi realizada.
         :return Line A nova linha encontrada.
         """
-        comps = [None]
-        
-        for y in xrange(line.up, line.down):
-            _x = int(dpoint.x + line.polynom(y))
-            _y = int(dpoint.y + y)
-            
-            for _x in xrange(_x - 10, _x + 10):
-                if 0 <= _x < line.map.shape.x and 0 <= _y < line.map.shape.y \
-                and line.map[_x, _y] not in comps \
-                and line.map[_x, _y] is not None \
-                and line.map[_x, _y].line is None:
-                    comps.append(line.map[_x, _y])
-                    
-        newl = cls(line.map, *comps[1:])
+        ys = numpy.arange(line.up, line.down)
+        xs = dpoint.x + line.polynom(ys)
+
+        comps = [
+            comp for comp in line.map.band(xs, dpoint.y + ys, 10)
+                if comp.line is None
+        ]
+
+        newl = cls(line.map, *comps)
         newl.neigh['left' if direction > 0 else 'right'] = \
             dpoint.euclidean((0,0)), line
         
@@ -91,17 +87,21 @@ class Line(ComponentList):
         @return list
         """
         return sum([comp.points for comp in self.comps], [])
-    
+
     @property
     def polynom(self):
         """
         Executa regressão polinomial nos componentes e encontra o polinômio,
-        e a curva que melhor se encaixam nos pontos da linha.
+        e a curva que melhor se encaixam nos pontos da linha. As equações
+        normais são montadas a partir das somas de potências mantidas a
+        cada inclusão ou remoção de componentes, sem que os pontos de todos
+        os componentes precisem ser reunidos.
         @return polynom Polinômio obtido dos pontos.
         """
         if self.__polynom is None:
-            x, y = zip(*self.points)
-            self.__polynom = numpy.poly1d(numpy.polyfit(y, x, deg = 2))
+            s = self.__sums
+            a = s[[4, 3, 2, 3, 2, 1, 2, 1, 0]].reshape(3, 3)
+            self.__polynom = numpy.poly1d(numpy.linalg.solve(a, s[[7, 6, 5]]))
             
         return self.__polynom
     
@@ -165,26 +165,23 @@ class Line(ComponentList):
         momento de construção da linha.
         @return None
         """
-        for _, comp in self.walkover(self.up, self.down):
-            if comp is not None and comp not in self.comps \
-            and comp.line is None:
+        for comp in self.walkover(self.up, self.down):
+            if comp not in self.comps and comp.line is None:
                 self.add(comp)
     
     def walkover(self, *control):
         """
         Anda por sobre o polinômio da linha e encontra o que está sob ele.
+        O polinômio é avaliado sobre todo o caminho de uma única vez, e a
+        faixa de largura igual à densidade da linha é consultada no mapa
+        em uma única operação.
         @param list control Lista de parâmetros para o caminho na linha.
-        @yields Point, Component
+        @return list Componentes distintos, na ordem do caminho.
         """
-        xlim, ylim = self.map.shape
-        d = self.density / 2
-        
-        for y in xrange(*control):
-            x = int(round(self.polynom(y)))
-            
-            for x in xrange(x - d, x + d):
-                if 0 <= x < xlim and 0 <= y < ylim:
-                    yield Point(x, y), self.map[x, y]
+        ys = numpy.arange(*control)
+        xs = numpy.round(self.polynom(ys))
+
+        return self.map.band(xs, ys, self.density / 2)
         
     def nearby(self):
         """
@@ -192,20 +189,12 @@ class Line(ComponentList):
         linha - com uma distância máxima confiável até eles.
         @return list Componentes encontrados antes e depois da linha atual.
         """
-        before, after = None, None
         limit = self.density * 4
+
+        before = self.walkover(self.up - 1, self.up - limit, -1)
+        after = self.walkover(self.down + 1, self.down + limit)
                 
-        for _, comp in self.walkover(self.up - 1, self.up - limit, -1):
-            if comp is not None:
-                before = comp
-                break
-              
-        for _, comp in self.walkover(self.down + 1, self.down + limit):
-            if comp is not None:
-                after = comp
-                break
-                
-        return before, after
+        return (before or [None])[0], (after or [None])[0]
     
     def search(self, direction):
         """
@@ -224,17 +213,38 @@ class Line(ComponentList):
         delta = int(self.density / 3) * direction
         pn = Point(x0 + delta, px(x0 + delta))
 
+        offset = numpy.arange(-30, 30)
+        own = self.map.member(self.comps)
+
+        # O índice espacial informa os trechos do caminho que cruzam
+        # componentes de outras linhas. Os demais trechos são saltados.
+        step = math.hypot(1, df(y0))
+        spans = [
+            (int(start / step) - 2, end / step + 2)
+                for start, end, _ in self.map.index.along(
+                    (x0, y0), (direction / step, -df(y0) * direction / step),
+                    30 * step + 2, math.hypot(xlim, ylim), own
+                )
+        ]
+
         while 0 <= pn.x < xlim and 0 <= pn.y < ylim:
-            count, total = 0, 0.0
-           
-            for y in xrange(-30, 30):
-                x = int(ty(y) + pn.x)
-                y = int(pn.y) + y
-
-                if 0 <= x < xlim and 0 <= y < ylim:
-                    count = count + int(self.map[x, y] not in ([None] + self.comps))
-                    total = total + 1
-                        
+            spans = [span for span in spans if span[1] >= abs(delta)]
+
+            if not spans:
+                return False
+
+            if abs(delta) < spans[0][0]:
+                delta = spans[0][0] * direction
+                pn = Point(x0 + delta, px(x0 + delta))
+                continue
+
+            xs = numpy.int_(ty(offset) + pn.x)
+            ys = int(pn.y) + offset
+
+            labels = self.map.labels(xs, ys)
+            total = float(numpy.count_nonzero(self.map.inside(xs, ys)))
+            count = numpy.count_nonzero((labels > 0) & ~own[labels])
+
             if total and (count / total) >= .25:
                 break
             
@@ -264,6 +274,7 @@ class Line(ComponentList):
             
             if comp.line is not None:
                 comp.line.comps.remove(comp)
+                comp.line.__sums = comp.line.__sums - comp.moments
                 comp.line.__polynom = None
                 
                 if comp.line.count > 0:
@@ -277,6 +288,7 @@ class Line(ComponentList):
                 self.down = comp.down
                 
             self.comps.append(comp)
+            self.__sums = self.__sums + comp.moments
             self.__polynom = None
             comp.line = self
             
@@ -293,18 +305,31 @@ class Line(ComponentList):
         """
         for comp in self.comps:
             comp.draw(img, color)
+
+        ys = numpy.arange(self.up, self.down)
+        xs = numpy.int_(numpy.round(self.polynom(ys)))
+        keep = self.map.inside(xs, ys)
+        xs, ys = xs[keep], ys[keep]
+
+        # Os pontos do polinômio sobre os componentes da linha são azuis, e
+        # os demais, vermelhos. Cada ponto é marcado por uma pequena cruz.
+        own = self.map.member(self.comps)[self.map.labels(xs, ys)]
+        cross = cv.getStructuringElement(cv.MORPH_CROSS, (3, 3))
+
+        for sel, mark in ((~own, (0, 0, 255)), (own, (255, 0, 0))):
+            dots = numpy.zeros(img.raw.shape[:2], numpy.uint8)
+            dots[ys[sel], xs[sel]] = 1
+            img.raw[cv.dilate(dots, cross) > 0] = mark
             
-        for y in xrange(self.up, self.down):
-            x = int(round(self.polynom(y)))
-            
-            if not 0 <= x < self.map.shape.x:
-                continue
-                
-            if self.map[x, y] in self.comps:
-                cv.circle(img.raw, (x, y), 0, (255, 0, 0), 2)
-            else:
-                cv.circle(img.raw, (x, y), 0, (0, 0, 255), 2)
-            
+# Registro de uma falha encontrada em uma linha: a linha, os pontos extremos
+# da falha na imagem original e seu comprimento em pixels e em metros.
+gaptype = numpy.dtype([
+    ("line", numpy.int32),
+    ("x0", numpy.float64), ("y0", numpy.float64),
+    ("x1", numpy.float64), ("y1", numpy.float64),
+    ("length", numpy.int32), ("meters", numpy.float64),
+])
+
 class LineList(object):
     """
     Armazena e manipula uma lista de linhas obtidas de uma
@@ -352,6 +377,78 @@ class LineList(object):
 
         return llst
 
+    @classmethod
+    def detect(cls, cmap, least = .2):
+        """
+        Propõe todas as linhas de uma única vez, a partir do perfil de
+        projeção da máscara ao longo da direção das linhas. O espaçamento
+        entre as linhas é estimado pela autocorrelação do perfil, e cada
+        pico do perfil é uma linha. Os componentes são então atribuídos ao
+        pico mais próximo de seu centro em uma única operação.
+        :param cmap Mapa de componentes, com as linhas na vertical.
+        :param least Altura mínima de um pico, em relação ao maior deles.
+        :return LineList
+        """
+        llst = cls(cmap)
+        profile = (cmap.img.raw != 0).sum(0).astype(float)
+
+        signal = profile - profile.mean()
+        corr = numpy.correlate(signal, signal, "full")[len(signal) - 1:]
+        lags = numpy.flatnonzero((corr[1:-1] > corr[:-2]) & (corr[1:-1] >= corr[2:])) + 1
+        lags = lags[lags >= 4]
+
+        if not len(lags) or not len(cmap.comp[1:]):
+            return llst
+
+        period = int(lags[numpy.argmax(corr[lags])])
+        width = max(3, period // 4)
+        smooth = numpy.convolve(profile, numpy.ones(width) / width, "same")
+
+        peaks = numpy.flatnonzero(
+            (smooth[1:-1] >= smooth[:-2]) & (smooth[1:-1] > smooth[2:])
+            & (smooth[1:-1] >= least * smooth.max())
+        ) + 1
+
+        # Picos mais próximos que meio espaçamento pertencem à mesma
+        # linha, e apenas o mais alto deles é mantido.
+        rows = []
+
+        for peak in peaks[numpy.argsort(-smooth[peaks])].tolist():
+            if all(abs(peak - row) >= period / 2. for row in rows):
+                rows.append(peak)
+
+        if not rows:
+            return llst
+
+        rows = numpy.sort(rows)
+        index = cmap.index
+
+        # Componentes mais largos que o espaçamento ligam linhas vizinhas
+        # e não são atribuídos a nenhuma delas.
+        center = index.centers[:, 0]
+        near = numpy.abs(center[:, None] - rows).argmin(axis = 1)
+        keep = (numpy.abs(center - rows[near]) <= period / 2.) \
+             & (index.boxes[:, 2] - index.boxes[:, 0] <= period)
+
+        for i in xrange(len(rows)):
+            comps = [index.comps[j] for j in numpy.flatnonzero(keep & (near == i))]
+
+            if comps:
+                llst.add(Line(cmap, *comps))
+
+        # A distância mínima entre linhas é medida até a borda da linha
+        # vizinha, como na busca gulosa.
+        half = numpy.median(index.boxes[keep, 2] - index.boxes[keep, 0]) / 2.
+
+        for left, right in zip(llst.lines[:-1], llst.lines[1:]):
+            y0 = (right.down - right.up) * .5 + right.up
+            dist = abs(right.polynom(y0) - left.polynom(y0))
+            left.neigh['right'] = dist, right
+            right.neigh['left'] = dist, left
+            llst.mindist = min(llst.mindist, dist - half)
+
+        return llst
+
     @property
     def count(self):
         """
@@ -394,8 +491,10 @@ class LineList(object):
         """
         for pos, line in self.search():
             self.lines.insert(pos, line)
-        
-        line = self.lines[-1]
+
+        # Linhas cujos componentes foram todos tomados por outras
+        # linhas deixam de existir.
+        self.lines[:] = [line for line in self.lines if line.comps]
 
     def display(self, inverted):
         """
@@ -407,72 +506,99 @@ class LineList(object):
         for line in self.lines:
             line.draw(img, (255, 255, 255))
 
+        img = self.map.restore(img)
+
         if inverted:
             img = img.transpose()
 
         return img
         
+    @staticmethod
+    def runs(mask):
+        """
+        Codifica por comprimento de sequência os trechos verdadeiros de
+        um vetor booleano.
+        :param mask Vetor a ser codificado.
+        :return numpy.ndarray, numpy.ndarray Início e fim, exclusivo, de cada trecho.
+        """
+        edge = numpy.diff(numpy.concatenate([[0], numpy.int8(mask), [0]]))
+        return numpy.flatnonzero(edge == 1), numpy.flatnonzero(edge == -1)
+
     def error(self, distance, inverted):
         """
-        Contabiliza a porcentagem de erros nas linhas encontradas.
+        Contabiliza a porcentagem de erros nas linhas encontradas. A
+        ocupação de cada linha é calculada de uma única vez sobre todos
+        os seus pontos, e as falhas são os trechos desocupados mais longos
+        que a distância máxima admitida.
         @param distance Distância entre linhas em metros.
-        @return float, int Porcentagem e metros de falhas encontradas.
-        @return inverted Imagem está invertida?
+        @param inverted Imagem está invertida?
+        @return float, float, float, Image, numpy.ndarray Porcentagem e metros
+            de falhas, metros de plantação, imagem das falhas e registros
+            de cada falha encontrada.
         """
         img = Image.new(self.shape)
-        red, blue = 0, 0
-        distmedia = 0
+        maxdist = self.mindist / distance
+        metro = 2 * maxdist
 
-        for line in self.lines:
-            #proxline = min(line.neigh["left"][0], line.neigh["right"][0])
-            maxdist = (self.mindist / distance)
-            distmedia += maxdist
-            points = []
-            
-            for comp in line.comps:
-                comp.draw(img, (255, 255, 255))
-
-
-            #for y in xrange(line.up, line.down):
-            for y, x in line.interpolate():
-                incomp = False
-
-                for _x in xrange(x - 5, x + 5):
-                #for _x in xrange(x - 1, x + 1):
-                    if 0 <= _x < self.shape.x \
-                    and self.map[_x, y] is not None and self.map[_x, y] in line.comps:
-                        incomp = True
-                        break
-
-                if incomp:
-                    if len(points) > maxdist:
-                        for p in points:
-                            cv.circle(img.raw, p, 0, (0,0,255),0) # vermelho
-                        red += len(points)
-                    elif len(points) > 0:
-                        for p in points:
-                            cv.circle(img.raw, p, 0, (255,0,0),0) # azul
-                        blue += len(points)
-
-                    cv.circle(img.raw, (x,y), 0, (255,0,0),0)
-                    points = []
-                    blue += 1
-
-                else:
-                    points.append(Point(x,y))
-
-            if len(points) > maxdist:
-                for p in points:
-                    cv.circle(img.raw, p, 0, (0,0,255),0)
-                red += len(points)
-            elif len(points) > 0:
-                for p in points:
-                    cv.circle(img.raw, p, 0, (255,0,0),0)
-                blue += len(points)
+        red, blue = [], []
+        records = []
+
+        for i, line in enumerate(self.lines):
+            ys = numpy.arange(line.up, line.down)
+            xs = numpy.int_(numpy.round(line.polynom(ys)))
+
+            # Os pontos da linha e suas vizinhanças são consultados no
+            # mapa de uma única vez.
+            own = self.map.member(line.comps)
+            near = own[self.map.labels(xs[:, None] + numpy.arange(-5, 5), ys[:, None])].any(axis = 1)
+
+            # Pontos sobre regiões sem dados não são falhas nem
+            # plantação, e portanto não são contabilizados.
+            if self.map.valid is not None:
+                inside = self.map.inside(xs, ys)
+                keep = numpy.ones(len(xs), bool)
+                keep[inside] = self.map.valid[ys[inside], xs[inside]]
+                xs, ys, near = xs[keep], ys[keep], near[keep]
+
+            begin, end = self.runs(~near)
+            long = (end - begin) > maxdist
+            gap = numpy.zeros(len(near), bool)
+
+            for b, e in zip(begin[long], end[long]):
+                gap[b:e] = True
+                records.append((i, xs[b], ys[b], xs[e - 1], ys[e - 1], e - b, (e - b) / metro))
+
+            red.append(numpy.column_stack([xs[gap], ys[gap]]))
+            blue.append(numpy.column_stack([xs[~gap], ys[~gap]]))
+
+        red = numpy.concatenate(red) if red else numpy.zeros((0, 2), int)
+        blue = numpy.concatenate(blue) if blue else numpy.zeros((0, 2), int)
+
+        # A imagem das falhas é desenhada de uma vez: os componentes das
+        # linhas em branco, a plantação em azul e as falhas em vermelho.
+        comps = sum([line.comps for line in self.lines], [])
+        img.raw[self.map.member(comps)[self.map.img.raw]] = (255, 255, 255)
+
+        for points, color in ((blue, (255, 0, 0)), (red, (0, 0, 255))):
+            points = points[self.map.inside(*points.T)]
+            img.raw[points[:, 1], points[:, 0]] = color
+
+        img = self.map.restore(img)
 
         if inverted:
             img = img.transpose()
 
-        total = red + blue
-        metro = 2 * (distmedia / len(self.lines))
-        return (100 * red) / float(total), red / metro, blue / metro, img
+        # Os extremos das falhas são levados ao referencial da imagem original.
+        gaps = numpy.array(records, gaptype)
+        # As coordenadas são calculadas antes de qualquer atribuição, pois
+        # as colunas do registro seriam sobrescritas enquanto lidas.
+        x, y = ("y", "x") if inverted else ("x", "y")
+        x0, y0 = [numpy.array(v) for v in self.map.points(gaps["x0"], gaps["y0"])]
+        x1, y1 = [numpy.array(v) for v in self.map.points(gaps["x1"], gaps["y1"])]
+        gaps[x + "0"], gaps[y + "0"] = x0, y0
+        gaps[x + "1"], gaps[y + "1"] = x1, y1
+
+        total = len(red) + len(blue)
+        pct = (100 * len(red)) / float(total) if total else 0.
+
+        return pct, len(red) / metro, len(blue) / metro, img, gaps
@@ -12,29 +12,51 @@ programa e também pela execução e apresentação dos
 resultados obtidos com a imagem fornecida.
 """
 from image import *
+from .spatial import Index
 import numpy
+import copy
 
 class Map(object):
     """
     Objeto responsável pelo armazenamento e intermediação
-    do mapa de componentes.
+    do mapa de componentes. O atributo  aligned  guarda o mapa,
+    transposto ou rotacionado, em que as linhas são rastreadas.
     """
 
-    def __init__(self, comps, shape, inverted):
+    def __init__(self, comps, shape, inverted, labels = None):
         """
         Inicializa uma nova instância do objeto.
         :param comps Todos os componentes encontrados.
         :param shape Tamanho do mapa a ser criado.
         :param inverted O mapa está invertido?
+        :param labels Imagem de rótulos de onde os componentes foram obtidos.
         :return Mapa de componentes inicializado.
         """
-        self.img = Image.new(shape, 1, numpy.uint16)
         self.comp = [None] + comps
         self.inverted = inverted
         self.shape = shape
+        self.valid = None
+        self.frame = None
+        self.aligned = self
+        self._index = None
+
+        if labels is None:
+            self.img = Image.new(shape, 1, numpy.uint16)
+
+            for i, comp in enumerate(comps):
+                comp.relabel(None, i + 1)
+                comp.draw(self.img, i + 1)
+
+            return
+
+        # Os rótulos originais são renumerados de acordo com a ordem dos
+        # componentes, e rótulos descartados passam a ser fundo.
+        remap = numpy.zeros(labels.max() + 1, numpy.uint16)
+        remap[[comp.label for comp in comps]] = numpy.arange(1, len(comps) + 1)
+        self.img = Image(remap[labels])
 
         [
-            comp.draw(self.img, i + 1)
+            comp.relabel(self.img.raw, i + 1)
                 for i, comp in enumerate(comps)
         ]
 
@@ -46,3 +68,127 @@ class Map(object):
         :return Componente a ser acessado.
         """
         return self.comp[self.img[index]]
+
+    @property
+    def index(self):
+        """
+        Índice espacial sobre os componentes do mapa. O índice é
+        construído uma única vez, no primeiro acesso.
+        :return Index
+        """
+        if self._index is None:
+            self._index = Index(self.comp[1:])
+
+        return self._index
+
+    def inside(self, xs, ys):
+        """
+        Verifica quais coordenadas estão dentro dos limites do mapa.
+        :param xs Coordenadas horizontais dos pontos.
+        :param ys Coordenadas verticais dos pontos.
+        :return numpy.ndarray Máscara das coordenadas válidas.
+        """
+        xs, ys = numpy.asarray(xs), numpy.asarray(ys)
+        return (0 <= xs) & (xs < self.shape.x) & (0 <= ys) & (ys < self.shape.y)
+
+    def labels(self, xs, ys):
+        """
+        Acessa, de uma única vez, os rótulos de várias posições do mapa.
+        Coordenadas fora dos limites do mapa recebem o rótulo de fundo.
+        :param xs Coordenadas horizontais dos pontos.
+        :param ys Coordenadas verticais dos pontos.
+        :return numpy.ndarray Rótulos encontrados, no formato das coordenadas.
+        """
+        xs, ys = numpy.broadcast_arrays(numpy.int_(xs), numpy.int_(ys))
+        inside = self.inside(xs, ys)
+
+        labels = numpy.zeros(xs.shape, self.img.raw.dtype)
+        labels[inside] = self.img.raw[ys[inside], xs[inside]]
+
+        return labels
+
+    def components(self, labels):
+        """
+        Reúne os componentes distintos presentes em uma lista de
+        rótulos, na ordem em que aparecem pela primeira vez.
+        :param labels Rótulos a serem convertidos.
+        :return list Componentes encontrados, sem o fundo.
+        """
+        labels = numpy.ravel(labels)
+        unique, first = numpy.unique(labels, return_index = True)
+
+        return [self.comp[i] for i in unique[numpy.argsort(first)] if i]
+
+    def band(self, xs, ys, width):
+        """
+        Encontra os componentes sob uma faixa horizontal em torno de uma
+        linha poligonal. Cada ponto da linha é expandido para os pixels
+        no intervalo [x - width, x + width) de sua linha na imagem.
+        :param xs Coordenadas horizontais dos pontos da linha.
+        :param ys Coordenadas verticais dos pontos da linha.
+        :param width Meia largura da faixa.
+        :return list Componentes encontrados, na ordem da linha.
+        """
+        offset = numpy.arange(-width, width)
+        xs = numpy.int_(xs)[:, None] + offset
+        ys = numpy.int_(ys)[:, None]
+
+        return self.components(self.labels(xs, ys))
+
+    def member(self, comps):
+        """
+        Cria uma tabela que indica, para cada rótulo do mapa, se o
+        componente correspondente pertence ao grupo dado.
+        :param comps Grupo de componentes.
+        :return numpy.ndarray
+        """
+        table = numpy.zeros(len(self.comp), bool)
+        table[[comp.label for comp in comps]] = True
+
+        return table
+
+    def points(self, xs, ys):
+        """
+        Leva coordenadas do referencial do mapa de volta ao original.
+        :param xs Coordenadas horizontais dos pontos.
+        :param ys Coordenadas verticais dos pontos.
+        :return numpy.ndarray, numpy.ndarray
+        """
+        if self.frame is not None:
+            return self.frame.points(xs, ys)
+
+        return numpy.asarray(xs, float), numpy.asarray(ys, float)
+
+    def unwarp(self, valid = None):
+        """
+        Produz o mapa no referencial original a partir dos rótulos deste
+        mapa, desfazendo a rotação e a transposição. Os componentes são
+        os mesmos, ainda descritos no referencial deste mapa, que passa
+        a ser o mapa alinhado do novo mapa.
+        :param valid Máscara dos pixels com dados no referencial original.
+        :return Map
+        """
+        img = self.restore(self.img)
+
+        if self.inverted:
+            img = img.transpose()
+
+        cmap = copy.copy(self)
+        cmap.img, cmap.shape = img, img.shape
+        cmap.valid = None if valid is None else valid.raw > 0
+        cmap.frame, cmap.aligned, cmap._index = None, self, None
+
+        return cmap
+
+    def restore(self, image):
+        """
+        Leva uma imagem desenhada sobre o mapa de volta ao referencial
+        original. Mapas rastreados em um referencial rotacionado são
+        desfeitos por uma única transformação afim.
+        :param image Imagem no referencial do mapa.
+        :return Image
+        """
+        if self.frame is not None:
+            image = Image(self.frame.backward(image.raw))
+
+        return image
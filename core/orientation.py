@@ -0,0 +1,111 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""
+PSG - Tecnologia Aplicada
+
+Este é um módulo utilizado para contagem de falhas em
+plantações de cana-de-açúcar através do uso de imagens
+aéreas capturadas por VANT's ou aparelhos similares.
+
+Este arquivo é responsável pelo desenho da interface do
+programa e também pela execução e apresentação dos
+resultados obtidos com a imagem fornecida.
+"""
+import cv2 as cv
+import numpy
+import math
+
+from .util import Point
+
+__all__ = [
+    "estimate",
+    "Frame",
+]
+
+def estimate(raw):
+    """
+    Estima a direção dominante das linhas de plantação de uma
+    máscara binária através de seu tensor de estrutura. As bordas
+    das linhas concentram os gradientes na direção perpendicular
+    às linhas, o que permite estimar a orientação de toda a
+    máscara de uma única vez.
+    :param raw Máscara binária a ser analisada.
+    :return float, float Ângulo das linhas em relação ao eixo vertical,
+        em graus no intervalo (-90, 90], e coerência da estimativa.
+    """
+    raw = numpy.float32(raw)
+    gx = cv.Sobel(raw, cv.CV_32F, 1, 0, ksize = 3)
+    gy = cv.Sobel(raw, cv.CV_32F, 0, 1, ksize = 3)
+
+    jxx = float((gx * gx).sum())
+    jyy = float((gy * gy).sum())
+    jxy = float((gx * gy).sum())
+
+    if jxx + jyy == 0:
+        return 0., 0.
+
+    angle = math.degrees(.5 * math.atan2(2 * jxy, jxx - jyy))
+    coherence = math.sqrt((jxx - jyy) ** 2 + 4 * jxy ** 2) / (jxx + jyy)
+
+    return (angle if angle > -90 else angle + 180), coherence
+
+class Frame(object):
+    """
+    Referencial rotacionado de uma imagem. Permite que as linhas de
+    plantação sejam rastreadas sempre na vertical, e que os resultados
+    sejam levados de volta ao referencial original por uma única
+    transformação afim.
+    """
+
+    def __init__(self, shape, angle):
+        """
+        Inicializa uma nova instância do objeto.
+        :param shape Tamanho da imagem original.
+        :param angle Ângulo das linhas, como estimado por estimate.
+        :return Frame
+        """
+        w, h = shape
+        rad = math.radians(angle)
+        cos, sin = abs(math.cos(rad)), abs(math.sin(rad))
+
+        # A tela rotacionada é expandida para que nenhum pixel da
+        # imagem original seja perdido durante a rotação.
+        nw = int(math.ceil(w * cos + h * sin))
+        nh = int(math.ceil(w * sin + h * cos))
+
+        self.matrix = cv.getRotationMatrix2D((w / 2., h / 2.), angle, 1.)
+        self.matrix[:, 2] += (nw - w) / 2., (nh - h) / 2.
+        self.inverse = cv.invertAffineTransform(self.matrix)
+
+        self.angle = angle
+        self.original = Point(w, h)
+        self.shape = Point(nw, nh)
+
+    def forward(self, raw):
+        """
+        Leva uma imagem do referencial original para o rotacionado.
+        :param raw Matriz da imagem no referencial original.
+        :return numpy.ndarray
+        """
+        return cv.warpAffine(raw, self.matrix, tuple(self.shape), flags = cv.INTER_NEAREST)
+
+    def backward(self, raw):
+        """
+        Leva uma imagem do referencial rotacionado de volta ao original.
+        :param raw Matriz da imagem no referencial rotacionado.
+        :return numpy.ndarray
+        """
+        return cv.warpAffine(raw, self.inverse, tuple(self.original), flags = cv.INTER_NEAREST)
+
+    def points(self, xs, ys):
+        """
+        Leva coordenadas do referencial rotacionado ao original.
+        :param xs Coordenadas horizontais dos pontos.
+        :param ys Coordenadas verticais dos pontos.
+        :return numpy.ndarray, numpy.ndarray
+        """
+        xs, ys = numpy.asarray(xs, float), numpy.asarray(ys, float)
+        ox = self.inverse[0, 0] * xs + self.inverse[0, 1] * ys + self.inverse[0, 2]
+        oy = self.inverse[1, 0] * xs + self.inverse[1, 1] * ys + self.inverse[1, 2]
+
+        return ox, oy
@@ -51,7 +51,8 @@ class PatchWork(Image, Grid):
         Recorta a imagem, cria todos os retalhos possíveis
         de existirem sobre a imagem e seleciona apenas aqueles
         que estão acima da porcentagem mínima de preenchimento
-        do retalho.
+        do retalho. A máscara de pixels válidos de cada retalho
+        é calculada neste momento e acompanha o retalho.
         :param least Porcentagem mínima de preenchimento.
         :param filter O resultado deve ser filtrado?
         """
@@ -36,6 +36,7 @@ class LayeredPatch(Patch, List, Element):
         Element.__init__(self, lpwork, elem)
 
         self.psize = Point(*psize)
+        self._valid = self[0].valid
 
     __getitem__ = List.__getitem__
     __setitem__ = List.__setitem__
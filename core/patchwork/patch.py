@@ -14,7 +14,7 @@ resultados obtidos com a imagem fornecida.
 from ..image import Image
 from ..util import Point
 from ..grid import Element
-import cv2 as cv
+import numpy
 
 class Patch(Image, Element):
     """
@@ -35,6 +35,20 @@ class Patch(Image, Element):
         Image.__init__(self, pwork.region(pos, psize).raw)
 
         self.psize = Point(*psize)
+        self._valid = None
+
+    @property
+    def valid(self):
+        """
+        Máscara dos pixels do retalho que possuem dados. As bordas
+        dos ortomosaicos são regiões pretas, sem dados, que não
+        devem ser segmentadas. A máscara é calculada uma única vez.
+        :return numpy.ndarray
+        """
+        if self._valid is None:
+            self._valid = self.binarize(thresh = 25).raw > 0
+
+        return self._valid
 
     @property
     def fill(self):
@@ -43,8 +57,7 @@ class Patch(Image, Element):
         tamanho que o retalho deveria ter.
         :return float
         """
-        imgb = self.binarize(thresh = 25).raw
-        value = cv.countNonZero(imgb)
+        value = numpy.count_nonzero(self.valid)
 
         return value / float(self.psize.x * self.psize.y)
 
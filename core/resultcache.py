@@ -0,0 +1,206 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""
+PSG - Tecnologia Aplicada
+
+Este é um módulo utilizado para contagem de falhas em
+plantações de cana-de-açúcar através do uso de imagens
+aéreas capturadas por VANT's ou aparelhos similares.
+
+Este arquivo é responsável pelo desenho da interface do
+programa e também pela execução e apresentação dos
+resultados obtidos com a imagem fornecida.
+"""
+from .segmentator import digest, signature
+from .util import replace
+from .image import Image
+import threading
+import warnings
+import hashlib
+import config
+import numpy
+import os
+
+__all__ = [
+    "ResultCache",
+]
+
+class ResultCache(object):
+    """
+    Armazena em disco os resultados do processamento de retalhos. Cada
+    resultado é endereçado pelo conteúdo do retalho, pela versão do
+    conjunto de treinamento e pelos parâmetros do algoritmo; assim, um
+    retalho inalterado nunca é processado duas vezes. Os resultados
+    menos usados recentemente são descartados quando o tamanho máximo
+    do armazenamento é excedido.
+    """
+    _lock = threading.Lock()
+    _version = None, None
+    _total = None
+
+    # Revisão do formato dos resultados. Deve ser incrementada sempre que
+    # resultados já armazenados deixarem de ser válidos.
+    revision = 2
+
+    folder = os.path.join(config.cache, "results")
+
+    @classmethod
+    def enabled(cls):
+        """
+        Verifica se o armazenamento de resultados está ativo.
+        :return bool
+        """
+        return config.resultcache > 0
+
+    @classmethod
+    def version(cls):
+        """
+        Versão do conjunto de treinamento. A assinatura do conteúdo dos
+        arquivos só é recalculada quando eles forem modificados.
+        :return str
+        """
+        files = config.root + "/trainset.csv", config.root + os.sep + 'patchtrain.csv'
+        sig = signature(*files)
+
+        with cls._lock:
+            if cls._version[0] != sig:
+                cls._version = sig, digest(*files)
+
+            return cls._version[1]
+
+    @classmethod
+    def key(cls, patch, distance, angle = None):
+        """
+        Calcula o endereço do resultado de uma tarefa.
+        :param patch Retalho a ser processado.
+        :param distance Distância entre as linhas de plantação.
+        :param angle Ângulo das linhas de plantação, caso conhecido. O
+            ângulo é arredondado a décimos de grau, pois é estimado
+            novamente a cada execução.
+        :return str
+        """
+        raw = numpy.ascontiguousarray(patch.raw)
+        sha = hashlib.sha1(raw.data)
+        angle = None if angle is None else round(angle, 1)
+
+        sha.update(repr((cls.revision, raw.shape, raw.dtype.str, cls.version())))
+        sha.update(repr((distance, angle)))
+        sha.update(repr((
+            config.segbackend, config.segtable, config.segcoarse,
+            config.lineengine, config.deskew,
+        )))
+
+        return sha.hexdigest()
+
+    @classmethod
+    def fname(cls, key):
+        """
+        Nome do arquivo que armazena um resultado.
+        :param key Endereço do resultado.
+        :return str
+        """
+        return os.path.join(cls.folder, key + ".npz")
+
+    @classmethod
+    def load(cls, key):
+        """
+        Recupera um resultado armazenado, e o marca como recentemente usado.
+        :param key Endereço do resultado.
+        :return dict|None Máscara, imagem das falhas, registros das falhas,
+            porcentagem e metros de falhas e metros de plantação.
+        """
+        fname = cls.fname(key)
+
+        try:
+            with numpy.load(fname) as f:
+                result = dict(
+                    mask = Image(f["mask"]),
+                    image = Image(f["image"]),
+                    gaps = f["gaps"],
+                    percent = float(f["percent"]),
+                    meters = float(f["meters"]),
+                    crop = float(f["crop"]),
+                )
+
+            os.utime(fname, None)
+            return result
+
+        except (IOError, OSError, KeyError, ValueError):
+            return None
+
+    @classmethod
+    def store(cls, key, mask, data):
+        """
+        Armazena o resultado de uma tarefa concluída. O arquivo é escrito
+        em um arquivo temporário e renomeado, evitando leituras de
+        arquivos incompletos.
+        :param key Endereço do resultado.
+        :param mask Máscara produzida pela segmentação.
+        :param data Dados de execução da tarefa, já processada.
+        """
+        fname = cls.fname(key)
+        tmp = "{0}.{1}.{2}.tmp".format(fname, os.getpid(), threading.current_thread().ident)
+
+        try:
+            if not os.path.isdir(cls.folder):
+                os.makedirs(cls.folder)
+
+            with open(tmp, "wb") as f:
+                numpy.savez_compressed(
+                    f, mask = mask.raw, image = data.image.raw, gaps = data.gaps,
+                    percent = data.percent, meters = data.meters, crop = data.crop
+                )
+
+            size = os.path.getsize(tmp)
+            replace(tmp, fname)
+
+        except (IOError, OSError) as e:
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+
+            warnings.warn("Could not write {0}: {1}".format(fname, e))
+            return
+
+        # O tamanho total do armazenamento é mantido em memória, e a pasta
+        # só é percorrida quando o tamanho máximo for excedido.
+        with cls._lock:
+            if cls._total is not None:
+                cls._total = cls._total + size
+
+            full = cls._total is None or cls._total > config.resultcache
+
+        if full:
+            cls.evict()
+
+    @classmethod
+    def evict(cls, limit = None):
+        """
+        Descarta os resultados usados há mais tempo até que o
+        armazenamento caiba no tamanho máximo.
+        :param limit Tamanho máximo em bytes. Por padrão, o da configuração.
+        """
+        limit = config.resultcache if limit is None else limit
+
+        with cls._lock:
+            cls._total = None
+
+            try:
+                names = [os.path.join(cls.folder, n) for n in os.listdir(cls.folder)]
+                stats = [(os.stat(n), n) for n in names if n.endswith(".npz")]
+                files = sorted((st.st_mtime, st.st_size, n) for st, n in stats)
+            except OSError:
+                return
+
+            total = sum(size for _, size, _ in files)
+
+            for _, size, name in files:
+                if total <= limit:
+                    break
+
+                try:
+                    os.remove(name)
+                    total = total - size
+                except OSError:
+                    pass
+
+            cls._total = total
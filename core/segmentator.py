@@ -11,12 +11,19 @@ Este arquivo é responsável pelo desenho da interface do
 programa e também pela execução e apresentação dos
 resultados obtidos com a imagem fornecida.
 """
+from .trainset import TrainSet
+from .util import replace
 from .image import Image
+from . import classifier
 
-from sklearn.neighbors import KNeighborsClassifier
+import cv2 as cv
+import threading
+import warnings
+import hashlib
 import config
 import numpy
 import os.path
+import os
 
 class Segmentator(object):
     """
@@ -24,59 +31,453 @@ class Segmentator(object):
     de métodos que possibilitam a binarização da imagem para
     processamento próximo e cálculo de falhas.
     """
+    _shared = {}
+    _lock = threading.Lock()
 
-    def __init__(self, x, y, k = 1):
+    def __init__(self, x, y, k = 1, backend = config.segbackend):
         """
         Inicializa e cria uma nova instância do objeto.
         :param x Entradas de casos de treinamento.
         :param y Classes dos casos de treinamento.
         :param k Número de vizinhos mais próximos a ser considerado.
+        :param backend Nome do classificador a ser utilizado.
         """
-        self.knn = KNeighborsClassifier(
-            n_neighbors = k,
-            warn_on_equidistant = False
-        )
+        self.x = numpy.asarray(x)
+        self.y = numpy.asarray(y)
+        self.model = classifier.create(backend, self.x, self.y, k)
 
-        self.knn.fit(x, y)
+        self.k = k
+        self.backend = backend
+        self.unique = config.segunique
+        self.coarse = config.segcoarse
+        self.digest = None
+        self.table = None
+        self.dist = None
+        self.shift = 0
 
     @classmethod
-    def train(cls, trainfile = config.root + "/trainset.csv", train = None):
+    def train(cls, trainfile = config.root + "/trainset.csv", train = None,
+              table = config.segtable, backend = config.segbackend):
         """
         Treina uma instância de Segmentator para aplicação
         do algoritmo de segmentação.
         :param trainfile Arquivo de casos de teste.
+        :param train Casos de treinamento já carregados.
+        :param table Bits por canal da tabela de consulta. Zero a desativa.
+        :param backend Nome do classificador a ser utilizado.
         :return Segmentator Nova instância
         """
         if train is not None:
-            return cls(*train)
-
-        x, y = [], []
-
-        with open(trainfile, "r") as trainl:
-            for line in trainl:
-                l = line.strip().split(' ')
-                x.append([int(l[0]), int(l[1]), int(l[2])])
-                y.append(int(l[3]))
-        patchfile = config.root+os.sep+'patchtrain.csv'
-        if os.path.isfile(patchfile):
-            with open(patchfile, "r") as trainl:
-             for line in trainl:
-                l = line.strip().split(' ')
-                x.append([int(l[0]), int(l[1]), int(l[2])])
-                y.append(int(l[3]))
-        return cls(x, y)
-
-    def apply(self, image):
+            return cls(*train, backend = backend)
+
+        patchfile = config.root + os.sep + 'patchtrain.csv'
+        sets = [TrainSet(trainfile), TrainSet(patchfile)]
+
+        data = [tset.load() for tset in sets if tset.exists]
+        x = numpy.concatenate([d[0] for d in data])
+        y = numpy.concatenate([d[1] for d in data])
+
+        seg = cls(x, y, backend = backend)
+        seg.digest = digest(trainfile, patchfile)
+
+        if table:
+            seg.build(table)
+
+        return seg
+
+    @classmethod
+    def shared(cls, trainfile = config.root + "/trainset.csv"):
+        """
+        Recupera a instância treinada compartilhada por todos os
+        threads do processo. O treinamento só é executado novamente
+        quando os arquivos de treinamento forem modificados.
+        :param trainfile Arquivo de casos de teste.
+        :return Segmentator Instância treinada.
+        """
+        patchfile = config.root + os.sep + 'patchtrain.csv'
+        key = signature(trainfile, patchfile)
+
+        with cls._lock:
+            if key not in cls._shared:
+                cls._shared.clear()
+                cls._shared[key] = cls.train(trainfile)
+
+            return cls._shared[key]
+
+    @classmethod
+    def increment(cls, x, y, trainfile = config.root + "/trainset.csv"):
+        """
+        Incorpora novos casos de treinamento à instância compartilhada
+        sem treiná-la novamente. Deve ser chamado logo após os casos
+        terem sido adicionados ao arquivo de treinamento.
+        :param x Entradas dos novos casos de treinamento.
+        :param y Classes dos novos casos de treinamento.
+        :param trainfile Arquivo de casos de teste.
+        :return Segmentator, numpy.ndarray Instância e células alteradas.
+        """
+        patchfile = config.root + os.sep + 'patchtrain.csv'
+
+        with cls._lock:
+            if not cls._shared:
+                return None, None
+
+            seg = cls._shared.values()[0]
+            stale = [seg.tablefile("table"), seg.tablefile("dist")]
+            changed = seg.update(x, y)
+            seg.digest = digest(trainfile, patchfile)
+
+            if seg.table is not None:
+                store(seg.tablefile("table"), seg.table)
+
+            if seg.dist is not None:
+                store(seg.tablefile("dist"), seg.dist)
+
+            # As tabelas da versão anterior do conjunto não serão mais
+            # utilizadas, e não devem se acumular em disco.
+            for fname in stale:
+                if fname not in (seg.tablefile("table"), seg.tablefile("dist")) \
+                and os.path.isfile(fname):
+                    os.remove(fname)
+
+            cls._shared = {signature(trainfile, patchfile): seg}
+
+        return seg, changed
+
+    @classmethod
+    def invalidate(cls):
+        """
+        Descarta as instâncias compartilhadas. Deve ser chamado
+        sempre que os arquivos de treinamento forem reescritos.
+        """
+        with cls._lock:
+            cls._shared.clear()
+
+    @property
+    def nearest(self):
+        """
+        Verifica se o classificador é o vizinho mais próximo, cuja
+        tabela de consulta pode ser mantida incrementalmente.
+        :return bool
+        """
+        return self.backend == "knn" and self.k == 1
+
+    def tablefile(self, name):
+        """
+        Nome do arquivo em que uma tabela do segmentador é salva.
+        :param name Nome da tabela.
+        :return str
+        """
+        return os.path.join(
+            config.cache,
+            "{0}-{1}-{2}{3}-{4}.npy".format(name, 8 - self.shift, self.backend, self.k, self.digest)
+        )
+
+    def build(self, bits = 6):
+        """
+        Constrói a tabela de consulta de cores. O classificador
+        é avaliado uma única vez no centro de cada célula do cubo
+        L*a*b* quantizado. A tabela é salva em disco e reaproveitada
+        enquanto os arquivos de treinamento não forem alterados.
+        :param bits Quantidade de bits por canal da tabela.
+        :return numpy.ndarray Tabela de consulta.
+        """
+        self.shift = 8 - bits
+        fname, dname = self.tablefile("table"), self.tablefile("dist")
+
+        if self.digest is not None and os.path.isfile(fname):
+            self.table = numpy.load(fname)
+            self.dist = numpy.load(dname) if os.path.isfile(dname) else None
+            return self.table
+
+        if self.nearest:
+            dist, table = self.model.nearest(cube(bits))
+            self.dist = numpy.reshape(dist, (1 << bits,) * 3)
+        else:
+            table = self.model.predict(cube(bits))
+
+        self.table = numpy.reshape(table, (1 << bits,) * 3)
+
+        if self.digest is not None:
+            store(fname, self.table)
+
+            if self.dist is not None:
+                store(dname, self.dist)
+
+        return self.table
+
+    def update(self, x, y):
+        """
+        Incorpora novos casos de treinamento ao classificador e à
+        tabela de consulta. Para o vizinho mais próximo, apenas as
+        células mais próximas de um novo caso do que de seu vizinho
+        atual são modificadas; os demais classificadores têm sua
+        tabela reavaliada.
+        :param x Entradas dos novos casos de treinamento.
+        :param y Classes dos novos casos de treinamento.
+        :return numpy.ndarray Células da tabela cuja classe foi alterada.
+        """
+        x = numpy.reshape(numpy.asarray(x, dtype = int), (-1, 3))
+        y = numpy.asarray(y, dtype = int)
+
+        self.x = numpy.concatenate([self.x, x])
+        self.y = numpy.concatenate([self.y, y])
+        self.model = classifier.create(self.backend, self.x, self.y, self.k)
+
+        if self.table is None:
+            return None
+
+        shape = self.table.shape
+        centers = cube(8 - self.shift)
+
+        if self.nearest and self.dist is not None:
+            table, dist = self.table.copy(), self.dist.copy()
+
+            for color, label in zip(x, y):
+                d = numpy.sqrt(((centers - color) ** 2).sum(1)).reshape(shape)
+                closer = d < dist
+                table[closer] = label
+                dist[closer] = d[closer]
+
+        elif self.nearest:
+            dist, table = self.model.nearest(centers)
+            table, dist = numpy.reshape(table, shape), numpy.reshape(dist, shape)
+
+        else:
+            table, dist = numpy.reshape(self.model.predict(centers), shape), None
+
+        changed = table != self.table
+        self.table, self.dist = table, dist
+
+        return changed
+
+    def affects(self, image, changed):
+        """
+        Verifica se alguma cor da imagem pertence às células
+        alteradas da tabela de consulta.
+        :param image Imagem a ser verificada.
+        :param changed Células alteradas, ou None se desconhecidas.
+        :return bool
+        """
+        if changed is None or self.table is None:
+            return True
+
+        cell = image.tolab().raw >> self.shift
+        return bool(changed[cell[..., 0], cell[..., 1], cell[..., 2]].any())
+
+    def apply(self, image, stats = None, valid = None):
         """
         Segmenta a imagem alvo.
         :param image Imagem alvo de segmentação.
+        :param stats Dicionário para o registro de medidas da segmentação.
+        :param valid Máscara dos pixels com dados. Os demais não são classificados.
         :return Imagem segmentada de acordo com o treinamento dado.
         """
+        if self.coarse > 1:
+            return self.refine(image, self.coarse, stats, valid)
+
         shape = image.raw.shape[:2]
         image = image.tolab()
+
+        if valid is not None:
+            mask = numpy.zeros(shape, dtype = numpy.uint8)
+            mask[valid] = self.predict(image.raw[valid], stats)
+            return Image(mask)
+
         image = numpy.reshape(image.raw, (shape[0] * shape[1], 3))
 
-        mask = numpy.array(self.knn.predict(image), dtype = numpy.uint8)
+        mask = self.predict(image, stats)
         mask = numpy.reshape(mask, shape)
         
         return Image(mask)
+
+    def refine(self, image, factor, stats = None, valid = None):
+        """
+        Segmenta a imagem alvo do grosso para o fino. Uma cópia
+        reduzida da imagem é classificada e ampliada; apenas os
+        pixels próximos às bordas entre classes são classificados
+        novamente na resolução original.
+        :param image Imagem alvo de segmentação.
+        :param factor Fator de redução da imagem.
+        :param stats Dicionário para o registro de medidas da segmentação.
+        :param valid Máscara dos pixels com dados. Os demais não são classificados.
+        :return Imagem segmentada de acordo com o treinamento dado.
+        """
+        h, w = image.raw.shape[:2]
+        size = max(1, w // factor), max(1, h // factor)
+
+        small = cv.resize(image.raw, size, interpolation = cv.INTER_AREA)
+        small = numpy.reshape(Image(small).tolab().raw, (-1, 3))
+        small = numpy.reshape(self.predict(small), size[::-1])
+
+        kernel = numpy.ones((3, 3), numpy.uint8)
+        edge = cv.dilate(small, kernel) != cv.erode(small, kernel)
+        edge = cv.resize(edge.astype(numpy.uint8), (w, h), interpolation = cv.INTER_NEAREST) > 0
+
+        mask = cv.resize(small, (w, h), interpolation = cv.INTER_NEAREST)
+
+        if valid is not None:
+            mask[~valid] = 0
+            edge &= valid
+
+        # Apenas os pixels das bordas são convertidos para L*a*b*.
+        pixels = image.raw[edge]
+
+        if len(pixels):
+            pixels = cv.cvtColor(pixels.reshape(-1, 1, 3), cv.COLOR_BGR2LAB).reshape(-1, 3)
+            mask[edge] = self.predict(pixels, stats)
+
+        if stats is not None:
+            stats["refined"] = edge.mean()
+
+        return Image(mask)
+
+    def apply_many(self, images, stats = None, valid = None):
+        """
+        Segmenta várias imagens de uma única vez. Os pixels de todas
+        as imagens são reunidos em uma única matriz contígua, que é
+        classificada de uma só vez. As máscaras retornadas são visões
+        sobre um único bloco de memória.
+        :param images Imagens alvo de segmentação.
+        :param stats Dicionário para o registro de medidas da segmentação.
+        :param valid Máscaras dos pixels com dados de cada uma das imagens.
+        :return list Imagens segmentadas, na mesma ordem dada.
+        """
+        if not images:
+            return []
+
+        valid = valid or [None] * len(images)
+
+        if self.coarse > 1:
+            return [self.apply(image, stats, v) for image, v in zip(images, valid)]
+
+        labs = [image.tolab().raw for image in images]
+        shapes = [lab.shape[:2] for lab in labs]
+        sizes = numpy.cumsum([0] + [h * w for h, w in shapes])
+        counts = numpy.cumsum([0] + [
+            h * w if v is None else numpy.count_nonzero(v)
+                for (h, w), v in zip(shapes, valid)
+        ])
+
+        pixels = numpy.empty((counts[-1], 3), dtype = numpy.uint8)
+
+        for lab, v, start, end in zip(labs, valid, counts[:-1], counts[1:]):
+            pixels[start:end] = numpy.reshape(lab, (-1, 3)) if v is None else lab[v]
+
+        labels = self.predict(pixels, stats)
+
+        if all(v is None for v in valid):
+            mask = labels
+        else:
+            mask = numpy.zeros(sizes[-1], dtype = numpy.uint8)
+
+            for shape, v, start, end, first, last in zip(
+                shapes, valid, counts[:-1], counts[1:], sizes[:-1], sizes[1:]):
+                view = numpy.reshape(mask[first:last], shape)
+
+                if v is None:
+                    view[...] = numpy.reshape(labels[start:end], shape)
+                else:
+                    view[v] = labels[start:end]
+
+        return [
+            Image(numpy.reshape(mask[start:end], shape))
+                for shape, start, end in zip(shapes, sizes[:-1], sizes[1:])
+        ]
+
+    def predict(self, pixels, stats = None):
+        """
+        Classifica uma lista de cores L*a*b*. Caso a tabela de
+        consulta tenha sido construída, a classificação é feita
+        por uma única indexação da tabela. Caso contrário, apenas
+        as cores distintas são classificadas, se assim configurado.
+        :param pixels Matriz (N, 3) de cores a serem classificadas.
+        :param stats Dicionário para o registro de medidas da segmentação.
+        :return numpy.ndarray Classe de cada uma das cores.
+        """
+        if not len(pixels):
+            return numpy.zeros(0, dtype = numpy.uint8)
+
+        if self.table is not None:
+            cell = pixels >> self.shift
+            return self.table[cell[:, 0], cell[:, 1], cell[:, 2]]
+
+        if not self.unique:
+            return self.model.predict(pixels)
+
+        code = pixels.astype(numpy.int32)
+        code = (code[:, 0] << 16) | (code[:, 1] << 8) | code[:, 2]
+        code, inverse = numpy.unique(code, return_inverse = True)
+
+        if stats is not None:
+            stats["unique"] = len(code) / float(len(pixels))
+
+        colors = numpy.column_stack([code >> 16, (code >> 8) & 255, code & 255])
+        return self.model.predict(colors)[inverse]
+
+def cube(bits):
+    """
+    Produz as cores centrais de cada célula do cubo L*a*b*
+    quantizado com a quantidade de bits por canal dada.
+    :param bits Quantidade de bits por canal.
+    :return numpy.ndarray Matriz (N, 3) de cores.
+    """
+    shift = 8 - bits
+    cells = numpy.indices((1 << bits,) * 3).reshape(3, -1).T
+    return (cells << shift) + ((1 << shift) >> 1)
+
+def digest(*files):
+    """
+    Calcula uma assinatura do conteúdo dos arquivos dados.
+    Arquivos inexistentes são ignorados.
+    :param files Arquivos a serem considerados.
+    :return str
+    """
+    sha = hashlib.sha1()
+
+    for fname in files:
+        if os.path.isfile(fname):
+            with open(fname, "rb") as f:
+                sha.update(f.read())
+
+    return sha.hexdigest()
+
+def signature(*files):
+    """
+    Produz uma assinatura barata dos arquivos dados, baseada
+    no tamanho e na data de modificação de cada um deles.
+    :param files Arquivos a serem considerados.
+    :return tuple
+    """
+    def stat(fname):
+        try:
+            st = os.stat(fname)
+            return fname, st.st_size, st.st_mtime
+        except OSError:
+            return fname, None, None
+
+    return tuple(map(stat, files))
+
+def store(fname, array):
+    """
+    Salva uma matriz em disco. A matriz é escrita em um arquivo
+    temporário e renomeada, evitando que outros threads leiam
+    um arquivo incompleto.
+    :param fname Nome do arquivo a ser criado.
+    :param array Matriz a ser salva.
+    """
+    tmp = "{0}.{1}.tmp".format(fname, os.getpid())
+
+    try:
+        if not os.path.isdir(os.path.dirname(fname)):
+            os.makedirs(os.path.dirname(fname))
+
+        with open(tmp, "wb") as f:
+            numpy.save(f, array)
+
+        replace(tmp, fname)
+
+    except (IOError, OSError) as e:
+        if os.path.isfile(tmp):
+            os.remove(tmp)
+
+        warnings.warn("Could not write {0}: {1}".format(fname, e))
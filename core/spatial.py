@@ -0,0 +1,102 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""
+PSG - Tecnologia Aplicada
+
+Este é um módulo utilizado para contagem de falhas em
+plantações de cana-de-açúcar através do uso de imagens
+aéreas capturadas por VANT's ou aparelhos similares.
+
+Este arquivo é responsável pelo desenho da interface do
+programa e também pela execução e apresentação dos
+resultados obtidos com a imagem fornecida.
+"""
+import numpy
+
+__all__ = [
+    "Index",
+]
+
+class Index(object):
+    """
+    Índice espacial sobre os componentes de um mapa. A imagem é dividida
+    em uma grade uniforme, e cada célula guarda os componentes cujas caixas
+    delimitadoras a tocam. Consultas sobre uma região visitam apenas as
+    células que a cobrem.
+    """
+    pack = 1 << 20
+
+    def __init__(self, comps, cell = 32):
+        """
+        Inicializa uma nova instância do objeto.
+        :param comps Componentes a serem indexados.
+        :param cell Tamanho, em pixels, de cada célula da grade.
+        :return Index
+        """
+        self.comps = list(comps)
+        self.cell = cell
+        self.buckets = {}
+
+        box = numpy.array([comp.box for comp in self.comps], int).reshape(-1, 4)
+        self.boxes = numpy.column_stack([box[:, :2], box[:, :2] + box[:, 2:]])
+        self.centers = (self.boxes[:, :2] + self.boxes[:, 2:]) / 2.
+
+        for i, (x0, y0, x1, y1) in enumerate(self.boxes.tolist()):
+            for cx in xrange(x0 // cell, (x1 - 1) // cell + 1):
+                for cy in xrange(y0 // cell, (y1 - 1) // cell + 1):
+                    self.buckets.setdefault(cx * self.pack + cy, []).append(i)
+
+    def cells(self, xs, ys):
+        """
+        Reúne os componentes presentes nas células que contêm os pontos dados.
+        :param xs Coordenadas horizontais dos pontos.
+        :param ys Coordenadas verticais dos pontos.
+        :return numpy.ndarray Índices dos componentes encontrados.
+        """
+        # Cada célula é identificada por um único inteiro, para que as
+        # células repetidas sejam descartadas por uma ordenação simples.
+        cx = numpy.floor_divide(numpy.ravel(xs), self.cell).astype(numpy.int64)
+        cy = numpy.floor_divide(numpy.ravel(ys), self.cell).astype(numpy.int64)
+        keys = numpy.unique(cx * self.pack + cy)
+
+        found = [self.buckets.get(key, []) for key in keys.tolist()]
+        return numpy.unique(numpy.concatenate([[]] + found)).astype(int)
+
+    def along(self, origin, direction, reach, length, exclude = None):
+        """
+        Encontra os componentes que cruzam um corredor que parte da origem
+        na direção dada. Para cada componente, é calculado o intervalo de
+        distâncias, ao longo da direção, em que o corredor o atravessa.
+        :param origin Ponto de partida do corredor.
+        :param direction Vetor unitário de direção do corredor.
+        :param reach Meia largura do corredor.
+        :param length Comprimento máximo do corredor.
+        :param exclude Tabela de rótulos dos componentes a serem ignorados.
+        :return list Intervalos (início, fim, componente) ordenados pelo início.
+        """
+        ox, oy = origin
+        dx, dy = direction
+        step = self.cell / 2.
+
+        # O corredor é amostrado com uma margem de uma célula, para que
+        # células apenas tocadas por suas bordas também sejam visitadas.
+        s = numpy.arange(-self.cell, length + self.cell, step)[:, None]
+        v = numpy.arange(-reach - self.cell, reach + self.cell, step)
+        found = self.cells(ox + s * dx - v * dy, oy + s * dy + v * dx)
+
+        if exclude is not None:
+            label = numpy.array([self.comps[i].label for i in found], int)
+            found = found[~exclude[label]] if len(found) else found
+
+        x0, y0, x1, y1 = self.boxes[found].T
+        cx = numpy.column_stack([x0, x1, x1, x0]) - ox
+        cy = numpy.column_stack([y0, y0, y1, y1]) - oy
+
+        u = cx * dx + cy * dy
+        w = cy * dx - cx * dy
+
+        keep = (w.max(axis = 1) >= -reach) & (w.min(axis = 1) <= reach) & (u.max(axis = 1) >= 0)
+        start, end = u.min(axis = 1).clip(min = 0)[keep], u.max(axis = 1)[keep]
+
+        spans = zip(start.tolist(), end.tolist(), [self.comps[i] for i in found[keep]])
+        return sorted(spans, key = lambda span: span[:2])
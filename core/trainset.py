@@ -0,0 +1,206 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""
+PSG - Tecnologia Aplicada
+
+Este é um módulo utilizado para contagem de falhas em
+plantações de cana-de-açúcar através do uso de imagens
+aéreas capturadas por VANT's ou aparelhos similares.
+
+Este arquivo é responsável pelo desenho da interface do
+programa e também pela execução e apresentação dos
+resultados obtidos com a imagem fornecida.
+"""
+from .util import replace
+import warnings
+import struct
+import numpy
+import sys
+import os
+
+__all__ = [
+    "TrainSet",
+]
+
+class TrainSet(object):
+    """
+    Conjunto de casos de treinamento da segmentação. Os casos são
+    mantidos em um arquivo de texto, separado por espaços, e em uma
+    cópia binária de leitura rápida. O arquivo binário é formado por
+    um pequeno cabeçalho, que guarda a quantidade de registros, seguido
+    de registros de quatro bytes (L*, a*, b* e classe), podendo ser
+    mapeado diretamente em memória.
+    """
+    magic = "AGTS"
+    header = struct.Struct("<4sBBHI")
+    version = 2
+
+    def __init__(self, fname):
+        """
+        Inicializa e cria uma nova instância do objeto.
+        :param fname Arquivo de texto dos casos de treinamento.
+        :return TrainSet
+        """
+        self.fname = fname
+        self.binary = os.path.splitext(fname)[0] + ".bin"
+
+    @property
+    def exists(self):
+        """
+        Verifica se o conjunto existe em algum dos formatos.
+        :return bool
+        """
+        return os.path.isfile(self.fname) or os.path.isfile(self.binary)
+
+    @property
+    def fresh(self):
+        """
+        Verifica se o arquivo binário existe e está atualizado
+        em relação ao arquivo de texto.
+        :return bool
+        """
+        if not os.path.isfile(self.binary):
+            return False
+
+        if not os.path.isfile(self.fname):
+            return True
+
+        return os.path.getmtime(self.binary) >= os.path.getmtime(self.fname)
+
+    def load(self):
+        """
+        Carrega os casos de treinamento. O arquivo binário é
+        preferido sempre que estiver atualizado; caso contrário,
+        o arquivo de texto é lido e convertido. Um arquivo binário
+        inválido também é substituído, caso o arquivo de texto exista.
+        :return numpy.ndarray, numpy.ndarray Entradas e classes.
+        """
+        try:
+            records = self.read() if self.fresh else self.convert()
+        except IOError:
+            if not os.path.isfile(self.fname):
+                raise
+
+            records = self.convert()
+
+        return records[:, :3].astype(int), records[:, 3].astype(int)
+
+    def read(self):
+        """
+        Lê os registros do arquivo binário.
+        :return numpy.ndarray Matriz (N, 4) de registros.
+        """
+        with open(self.binary, "rb") as f:
+            head = f.read(self.header.size)
+
+            if len(head) != self.header.size:
+                raise IOError("Invalid training set file: " + self.binary)
+
+            magic, version, size, _, count = self.header.unpack(head)
+
+            if magic != self.magic or version != self.version or size != 4:
+                raise IOError("Invalid training set file: " + self.binary)
+
+            raw = numpy.frombuffer(f.read(), dtype = numpy.uint8)
+
+        if len(raw) != 4 * count:
+            raise IOError("Incomplete training set file: " + self.binary)
+
+        return raw.reshape(-1, 4)
+
+    def parse(self):
+        """
+        Lê os registros do arquivo de texto.
+        :return numpy.ndarray Matriz (N, 4) de registros.
+        """
+        with open(self.fname, "r") as f:
+            raw = numpy.fromstring(f.read(), dtype = int, sep = " ")
+
+        return raw.reshape(-1, 4).astype(numpy.uint8)
+
+    def convert(self):
+        """
+        Converte o arquivo de texto para o formato binário.
+        :return numpy.ndarray Matriz (N, 4) de registros.
+        """
+        records = self.parse()
+
+        # A cópia binária apenas acelera as próximas leituras; os casos
+        # lidos continuam válidos caso ela não possa ser escrita.
+        try:
+            self.save(records)
+        except (IOError, OSError) as e:
+            warnings.warn("Could not write {0}: {1}".format(self.binary, e))
+
+        return records
+
+    def save(self, records):
+        """
+        Escreve o arquivo binário. O arquivo é escrito em um arquivo
+        temporário e renomeado, evitando que outros processos leiam
+        um arquivo incompleto.
+        :param records Matriz (N, 4) de registros.
+        """
+        tmp = "{0}.{1}.tmp".format(self.binary, os.getpid())
+
+        try:
+            with open(tmp, "wb") as f:
+                f.write(self.header.pack(self.magic, self.version, 4, 0, len(records)))
+                f.write(records.tobytes())
+
+            replace(tmp, self.binary)
+
+        except (IOError, OSError):
+            if os.path.isfile(tmp):
+                os.remove(tmp)
+
+            raise
+
+    def write(self, x, y):
+        """
+        Sobrescreve o conjunto com novos casos de treinamento.
+        :param x Entradas dos casos de treinamento.
+        :param y Classes dos casos de treinamento.
+        """
+        self.store(x, y, "w")
+
+    def append(self, x, y):
+        """
+        Adiciona novos casos ao fim do conjunto. O arquivo binário
+        é estendido, sem nova leitura do arquivo de texto, quando
+        está atualizado.
+        :param x Entradas dos casos de treinamento.
+        :param y Classes dos casos de treinamento.
+        """
+        self.store(x, y, "a")
+
+    def store(self, x, y, mode):
+        """
+        Escreve casos de treinamento em ambos os formatos.
+        :param x Entradas dos casos de treinamento.
+        :param y Classes dos casos de treinamento.
+        :param mode Modo de abertura dos arquivos.
+        """
+        records = numpy.column_stack([x, y]).astype(numpy.uint8)
+        incremental = mode == "w" or self.fresh
+
+        with open(self.fname, mode) as f:
+            for rec in records:
+                f.write(' '.join(map(str, rec)) + '\n')
+
+        if not incremental:
+            self.convert()
+            return
+
+        if mode == "a":
+            try:
+                records = numpy.concatenate([self.read(), records])
+            except IOError:
+                self.convert()
+                return
+
+        self.save(records)
+
+if __name__ == '__main__':
+    for fname in sys.argv[1:]:
+        print fname, "->", TrainSet(fname).binary, len(TrainSet(fname).convert())
@@ -13,8 +13,10 @@ resultados obtidos com a imagem fornecida.
 """
 from .point import Point
 from .vector import Vector
+from .disk import replace
 
 __all__ = [
     "Point",
-    "Vector"
+    "Vector",
+    "replace",
 ]
\ No newline at end of file
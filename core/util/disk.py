@@ -0,0 +1,44 @@
+#!/usr/bin/python
+# -*- encoding: utf-8 -*-
+"""
+PSG - Tecnologia Aplicada
+
+Este é um módulo utilizado para contagem de falhas em
+plantações de cana-de-açúcar através do uso de imagens
+aéreas capturadas por VANT's ou aparelhos similares.
+
+Este arquivo é responsável pelo desenho da interface do
+programa e também pela execução e apresentação dos
+resultados obtidos com a imagem fornecida.
+"""
+import time
+import os
+
+__all__ = [
+    "replace",
+]
+
+def replace(source, target, tries = 5):
+    """
+    Renomeia um arquivo, substituindo o destino caso ele exista. No
+    Windows, os.rename falha quando o destino existe; o destino é então
+    removido antes da renomeação. Como o destino pode estar aberto por
+    outro processo por um breve momento, a operação é repetida algumas
+    vezes antes que o erro seja propagado.
+    :param source Arquivo a ser renomeado.
+    :param target Novo nome do arquivo.
+    :param tries Quantidade máxima de tentativas.
+    """
+    for i in xrange(tries):
+        try:
+            os.rename(source, target)
+            return
+
+        except OSError:
+            if i == tries - 1:
+                raise
+
+        try:
+            os.remove(target)
+        except OSError:
+            time.sleep(.05)
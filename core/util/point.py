@@ -28,16 +28,31 @@ class Point(tuple):
         """
         return super(Point, cls).__new__(cls, [x, y])
 
-    def __init__(self, x, y):
+    __slots__ = ()
+
+    def __getnewargs__(self):
         """
-        Inicializa a nova instância do objeto.
-        :param x Valor do ponto no eixo-x.
-        :param y Valor do ponto no eixo-y.
-        :return Point
+        Argumentos para a recriação do objeto, utilizados quando
+        o ponto é serializado.
+        :return tuple
+        """
+        return tuple(self)
+
+    @property
+    def x(self):
+        """
+        Valor do ponto no eixo-x.
+        :return mixed
+        """
+        return self[0]
+
+    @property
+    def y(self):
+        """
+        Valor do ponto no eixo-y.
+        :return mixed
         """
-        super(Point, self).__init__()
-        self.x = x
-        self.y = y
+        return self[1]
 
     def __call__(self, function):
         """